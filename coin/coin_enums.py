@@ -54,6 +54,34 @@ class InputEvent(Const):
     KEYBOARD = coin.SoKeyboardEvent.getClassTypeId()
 
 
+class TaskPriority(Const):
+    """
+    Priority classes for delayed (todo) calls.  INPUT and GEOMETRY calls
+    keep their queued order; COSMETIC calls may run after later calls.
+    """
+
+    INPUT = 0       # Input handling (drag / mouse), ordered
+    GEOMETRY = 1    # Scenegraph and coordinate changes, ordered
+    COSMETIC = 2    # Style-only updates, may be reordered
+
+    ALL = (INPUT, GEOMETRY, COSMETIC)
+
+
+class LatencyStage(Const):
+    """
+    Stages timed by the drag latency instrumentation
+    """
+
+    MOUSE = 'mouse_state'           # MouseState update for the event
+    DRAG = 'update_drag'            # DragTracker.update_drag
+    PARTIAL = 'transform_partial'   # DragTracker.transform_partial
+    LINKED = 'linked_update'        # Geometry.propagate
+    COMMIT = 'commit'               # Geometry.set_coordinates
+    TOTAL = 'event_to_commit'       # mouse event to last committed write
+
+    ALL = (MOUSE, DRAG, PARTIAL, LINKED, COMMIT, TOTAL)
+
+
 class FontStyles(Const):
     """
     SoFont style enumerants
@@ -357,6 +385,7 @@ class NodeTypes(Const):
     GEO_SEPARATOR = coin.SoGeoSeparator
 
     GROUP = coin.SoGroup
+    INDEXED_LINE_SET = coin.SoIndexedLineSet
     KEYBOARD_EVENT = coin.SoKeyboardEvent
     LINE_SET = coin.SoLineSet
     MARKER_SET = coin.SoMarkerSet
@@ -236,7 +236,7 @@ class CoinGroup(object):
         Remove all children under the top node.
         """
 
-        self.top.removeAllChildren()
+        utils.remove_all_children(self.top)
 
     def dump(self, node=None):
         """
@@ -22,13 +22,18 @@
 """
 General utilities for pivy.coin objects
 """
-import math
+
+from itertools import chain
+from operator import methodcaller
+
+import numpy as np
 
 from ..support.core.const import Const
 
 from pivy import coin
 
 from .todo import todo
+from .path_index import PathIndex, get_node_key
 
 from pivy_trackers import GEO_SUPPORT
 
@@ -36,6 +41,9 @@ from .coin_enums import MarkerStyles, NodeSearch
 
 _NEAR_ZERO = 10**-30
 
+#returns the tuple value of an SbVec3f / SbVec3d
+_get_vec_value = methodcaller('getValue')
+
 class Describe(Const):
     """
     Describe nodes
@@ -215,23 +223,53 @@ def search(node, parent):
 
     return _sa
 
+def get_path(node, parent):
+    """
+    Return the path from the parent to the node, using the path index
+    where possible instead of a search action
+    """
+
+    _path = PathIndex.get_path(node, parent)
+
+    if _path is None:
+        _path = search(node, parent).getPath()
+
+    return _path
+
 def remove_child(node, parent):
     """
     Convenience wrapper for _remove_node
     """
 
+    def _fn(_x):
+        PathIndex.remove(_x, parent)
+        parent.removeChild(_x)
+
     if parent.findChild(node) >= 0:
-        todo.delay(parent.removeChild, node)
+        todo.delay(_fn, node)
+
+def remove_all_children(parent):
+    """
+    Remove all children of the passed node immediately
+    """
+
+    PathIndex.remove_children(parent)
+    parent.removeAllChildren()
 
 def insert_child(node, parent, index=-1):
     """
     Insert a node as a child of the passed node
     """
 
-    _fn = parent.addChild
+    def _fn(_x):
+
+        if index >= 0:
+            parent.insertChild(_x, index)
 
-    if index >= 0:
-        _fn = lambda _x: parent.insertChild(_x, index)
+        else:
+            parent.addChild(_x)
+
+        PathIndex.add(_x, parent)
 
     todo.delay(_fn, node)
 
@@ -265,6 +303,12 @@ def _apply_search(node, name='', node_type=None, interest=NodeSearch.FIRST):
     Perform a search for a node, returning a list of found nodes
     """
 
+    #use the path index if it covers the node
+    _result = PathIndex.find(node, name, node_type, interest)
+
+    if _result is not False:
+        return _result
+
     #define the search path
     _search = coin.SoSearchAction()
 
@@ -345,51 +389,170 @@ def toggle_switch(switch, toggle_all=False, index=-3):
     else:
         switch.whichChild = -1
 
-def transform_points(points, matrix):
+def get_point_dtype(node):
     """
-    Transform selected points by the transformation matrix
+    Return the numpy data type matching the storage of the node's point
+    field - SoMFVec3d for SoGeoCoordinate, SoMFVec3f otherwise
     """
 
-    #store the view state matrix if a valid node is passed.
-    #subsequent calls with null node will re-use the last valid node matrix
+    if GEO_SUPPORT:
 
-    _matrix = matrix
+        if isinstance(node, coin.SoGeoCoordinate):
+            return np.float64
 
-    if _matrix is None:
-        return points
+    return np.float32
 
-    _xlate = _matrix.getValue()[3]
+def get_point_array(node, dtype=None):
+    """
+    Return the points of a SoCoordinate3 / SoGeoCoordinate node as a
+    contiguous (N,3) array
 
-    if any(math.isnan(_v) for _v in _xlate):
-        return points
+    The field is read with a single getValues() call and the components
+    are streamed straight into a preallocated array - no intermediate
+    list of point tuples is built.  pivy does not expose the field
+    storage itself, so this is as close to a buffer read as it allows.
 
-    if all([_v < _NEAR_ZERO for _v in _xlate]):
-        return points
+    node - the coordinate node
+    dtype - array data type, None = match the point field storage
+    """
+
+    if dtype is None:
+        dtype = get_point_dtype(node)
+
+    _field = node.point
+    _num = _field.getNum()
+
+    if not _num:
+        return np.empty((0, 3), dtype=dtype)
+
+    _values = _field.getValues(0)
+
+    return np.fromiter(
+        chain.from_iterable(map(_get_vec_value, _values)),
+        dtype=dtype, count=_num * 3).reshape(_num, 3)
+
+def set_point_array(node, points, start=0, truncate=False):
+    """
+    Write an (N,3) array or list of 3-tuples to the points of a
+    SoCoordinate3 / SoGeoCoordinate node in a single field update.
+
+    node - the coordinate node
+    points - the points to write
+    start - first field index to write
+    truncate - if True, drop any field values past the written points.
+        Like setValues(), the default leaves them in place.
+    """
+
+    _field = node.point
+    _num = len(points)
+
+    _field.setValues(start, _num, points)
+
+    if truncate and _field.getNum() > start + _num:
+        _field.setNum(start + _num)
+
+def set_point_ranges(node, points, ranges):
+    """
+    Write only the passed index ranges of an (N,3) array to the points of
+    a SoCoordinate3 / SoGeoCoordinate node.  Notification is deferred to
+    the last write, so dependent shapes are notified once.
+
+    node - the coordinate node
+    points - the full (N,3) array of points
+    ranges - list of (start, end) index ranges to write
+    """
+
+    _field = node.point
+    _notify = _field.enableNotify(False)
+
+    for _start, _end in ranges[:-1]:
+        _field.setValues(_start, _end - _start, points[_start:_end])
+
+    _field.enableNotify(_notify)
+
+    _start, _end = ranges[-1]
+    _field.setValues(_start, _end - _start, points[_start:_end])
+
+def get_dirty_ranges(previous, points, max_rows, max_ranges):
+    """
+    Return the list of contiguous (start, end) index ranges in which the
+    points differ from the previous points.
+
+    Returns None if a full write is required - the point counts differ,
+    or more than max_rows points or max_ranges ranges have changed.
+    """
+
+    if previous.shape != points.shape:
+        return None
+
+    _rows = np.flatnonzero(np.any(previous != points, axis=1))
+
+    if len(_rows) > max_rows:
+        return None
+
+    if not len(_rows):
+        return []
+
+    _breaks = np.flatnonzero(np.diff(_rows) > 1) + 1
+
+    if len(_breaks) >= max_ranges:
+        return None
 
-    #append fourth point to each coordinate
-    _pts = [_v + (1.0,) for _v in points]
+    _starts = _rows[np.r_[0, _breaks]]
+    _ends = _rows[np.r_[_breaks - 1, -1]] + 1
 
-    _s = 0
-    _result = []
-    _l = len(_pts)
+    return list(zip(_starts.tolist(), _ends.tolist()))
 
-    #iterate the list, processing it in sets of four coordinates at a time
-    while _s < _l:
+def matrix_to_array(matrix):
+    """
+    Return the matrix as a 4x4 numpy array.
+    matrix - coin.SbMatrix or any 4x4 / 16-element iterable
+    """
+
+    if isinstance(matrix, coin.SbMatrix):
+        matrix = matrix.getValue()
+
+    return np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+
+def transform_array(points, matrix):
+    """
+    Transform an (N,3) array of points by a 4x4 matrix with a single
+    homogeneous multiply.  Returns an (N,3) numpy array.
+
+    Coin matrices use the row-vector convention (p' = p * M), so the
+    translation is stored in the fourth row.
+    """
+
+    _pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    _mat = matrix_to_array(matrix)
+
+    return _pts @ _mat[:3, :3] + _mat[3, :3]
 
-        _mat_pts = _pts[_s:_s + 4]
+def transform_points(points, matrix):
+    """
+    Transform selected points by the transformation matrix
+
+    points - list of 3-tuples or an (N,3) numpy array
+    matrix - coin.SbMatrix or 4x4 array
+
+    Returns a list of 3-tuples, or an (N,3) array if an array was passed
+    """
 
-        _last_point = len(_mat_pts)
+    if matrix is None:
+        return points
 
-        #pad the list if less than four points
-        for _i in range(len(_mat_pts), 4):
-            _mat_pts.append((0.0, 0.0, 0.0, 1.0))
+    _matrix = matrix_to_array(matrix)
+    _xlate = _matrix[3]
 
-        #convert and transform
-        _mat = coin.SbMatrix(_mat_pts)
+    if np.isnan(_xlate).any():
+        return points
+
+    if (_xlate < _NEAR_ZERO).all():
+        return points
 
-        for _v in _mat.multRight(_matrix).getValue()[:_last_point]:
-            _result.append(tuple(_v)[0:3])
+    _result = transform_array(points, _matrix)
 
-        _s += 4
+    if isinstance(points, np.ndarray):
+        return _result
 
-    return _result
\ No newline at end of file
+    return list(map(tuple, _result.tolist()))
@@ -0,0 +1,545 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Single-node event routing for Tracker objects
+"""
+
+import weakref
+
+from functools import partial
+from types import SimpleNamespace
+
+from pivy import coin
+
+from .coin_enums import NodeTypes as Nodes
+from .path_index import PathIndex, get_node_key
+from . import coin_utils
+
+class EventRouter():
+    """
+    Routes scene events from one SoEventCallback node to the trackers
+    which subscribe to them.
+
+    Callbacks are registered by owner and event type.  Local callbacks
+    receive every event of their type.  Pathed callbacks receive an event
+    only if the owner's path node lies on the picked path, found by looking
+    up the nodes of the picked path in a node -> owner table, or if the
+    owner is unpathed (no path node, or its path has been cleared).
+
+    Owners receive events once they have been activated with set_path(),
+    which is done when they are inserted into the scenegraph.  Owners
+    whose root is hidden by a switch receive no events, as an event
+    callback node under the switch would not be traversed.  Visibility
+    is cached per owner and dropped when a switch above any owner
+    changes.  Roots the path index cannot place are treated as visible.
+
+    Owners are dispatched in the order they were activated, which follows
+    their insertion into the scenegraph, so events reach trackers in
+    scenegraph order as they did with a callback node per tracker.  Each
+    owner's pathed callbacks run before its local callbacks.  Dispatch to
+    further owners stops once an event has been handled.
+
+    Owners are held weakly and bound method callbacks by WeakMethod, so
+    the router does not keep trackers alive.  Entries of collected owners
+    drop out of the tables.
+    """
+
+    #the single event callback node and the node it is inserted under
+    cb_node = None
+    scene_root = None
+
+    #event type name -> SoType of the types registered on the node
+    types = {}
+
+    #event type name -> callback called before any owner callbacks
+    global_callbacks = {}
+
+    #owner -> list of callback entries (callback ref, type, pathed)
+    subscriptions = weakref.WeakKeyDictionary()
+
+    #event type name -> {owner: [callback refs]} for active owners
+    pathed = {}
+    local = {}
+
+    #pick-path table, path node key -> owner, and active owner -> node key
+    paths = weakref.WeakValueDictionary()
+    nodes = weakref.WeakKeyDictionary()
+
+    #active owners whose pathed callbacks receive every event, in order
+    unpathed = weakref.WeakKeyDictionary()
+
+    #owner -> root node of the owner's subgraph, for visibility tests
+    roots = weakref.WeakKeyDictionary()
+
+    #active owner -> activation sequence number, for dispatch order
+    order = weakref.WeakKeyDictionary()
+    sequence = 0
+
+    #owner -> cached visibility, cleared when a watched switch changes
+    visibility = weakref.WeakKeyDictionary()
+
+    #switch node key -> sensor on the switch's whichChild field, and the
+    #count of switch changes seen
+    switch_sensors = {}
+    switch_version = 0
+
+    #owners whose path has been cleared by set_pathed()
+    cleared = weakref.WeakSet()
+
+    #owners whose pathed / local callbacks are switched off
+    muted_pathed = weakref.WeakSet()
+    muted_local = weakref.WeakSet()
+
+    @staticmethod
+    def get_ref(callback):
+        """
+        Return a callable returning the callback, referencing the instance
+        of a bound method weakly
+        """
+
+        if getattr(callback, '__self__', None) is not None:
+            return weakref.WeakMethod(callback)
+
+        return lambda: callback
+
+    @staticmethod
+    def attach(parent):
+        """
+        Create the event callback node and insert it at the head of the
+        parent, if not already done.  Returns the node.
+        """
+
+        if not EventRouter.cb_node:
+
+            EventRouter.scene_root = parent
+            EventRouter.cb_node = coin_utils.add_child(
+                Nodes.EVENT_CB, parent, 'EVENT_ROUTER', 0)
+
+            for _name, _type in EventRouter.types.items():
+
+                EventRouter.cb_node.addEventCallback(
+                    _type, partial(EventRouter.dispatch, _name))
+
+        return EventRouter.cb_node
+
+    @staticmethod
+    def add_type(event_type):
+        """
+        Register the dispatcher for an event type on the callback node
+        """
+
+        _name = event_type.getName().getString()
+
+        if _name in EventRouter.types:
+            return _name
+
+        EventRouter.types[_name] = event_type
+
+        if EventRouter.cb_node:
+
+            EventRouter.cb_node.addEventCallback(
+                event_type, partial(EventRouter.dispatch, _name))
+
+        return _name
+
+    @staticmethod
+    def set_global_callback(event_type, callback):
+        """
+        Set the callback called for every event of the type before any
+        owner callbacks, replacing the existing one
+        """
+
+        EventRouter.global_callbacks[EventRouter.add_type(event_type)] =\
+            callback
+
+    @staticmethod
+    def add_callback(owner, container):
+        """
+        Add a callback container (callback, type, pathed) for the owner
+        """
+
+        _entry = SimpleNamespace(
+            ref=EventRouter.get_ref(container.callback),
+            type=container.type,
+            pathed=container.pathed
+        )
+
+        EventRouter.subscriptions.setdefault(owner, []).append(_entry)
+
+        if owner in EventRouter.nodes:
+            EventRouter._add_to_tables(owner, _entry)
+
+    @staticmethod
+    def remove_callback(owner, callback, event_type=None):
+        """
+        Remove a callback of the owner, of any event type if None
+        """
+
+        _name = None
+
+        if event_type is not None:
+            _name = event_type.getName().getString()
+
+        _containers = EventRouter.subscriptions.get(owner, [])
+
+        for _c in list(_containers):
+
+            if _c.ref() != callback:
+                continue
+
+            if _name and _c.type.getName().getString() != _name:
+                continue
+
+            _containers.remove(_c)
+            EventRouter._remove_from_tables(owner, _c)
+
+    @staticmethod
+    def _add_to_tables(owner, entry):
+        """
+        Add a callback entry to the dispatch tables
+        """
+
+        _table = EventRouter.local
+
+        if entry.pathed:
+            _table = EventRouter.pathed
+
+        _name = EventRouter.add_type(entry.type)
+
+        if _name not in _table:
+            _table[_name] = weakref.WeakKeyDictionary()
+
+        _table[_name].setdefault(owner, []).append(entry.ref)
+
+    @staticmethod
+    def _remove_from_tables(owner, entry):
+        """
+        Remove a callback entry from the dispatch tables
+        """
+
+        _table = EventRouter.local
+
+        if entry.pathed:
+            _table = EventRouter.pathed
+
+        _owners = _table.get(entry.type.getName().getString(), {})
+        _callbacks = _owners.get(owner)
+
+        if not _callbacks or entry.ref not in _callbacks:
+            return
+
+        _callbacks.remove(entry.ref)
+
+        if not _callbacks:
+            del _owners[owner]
+
+    @staticmethod
+    def set_path(owner, node, root=None):
+        """
+        Activate the owner, routing its pathed callbacks to picks of the
+        passed node.  If the node is None, they receive every event.
+
+        root - the root node of the owner's subgraph.  Owners are skipped
+        while the root is hidden.
+        """
+
+        if root is not None:
+            EventRouter.roots[owner] = root
+
+        EventRouter.visibility.pop(owner, None)
+
+        _is_active = owner in EventRouter.nodes
+        _key = EventRouter.nodes.get(owner)
+
+        if _key is not None and EventRouter.paths.get(_key) is owner:
+            del EventRouter.paths[_key]
+
+        _key = None
+
+        if node is not None:
+            _key = get_node_key(node)
+            EventRouter.paths[_key] = owner
+
+        EventRouter.nodes[owner] = _key
+        EventRouter._set_path_state(owner)
+
+        if _is_active:
+            return
+
+        EventRouter.sequence += 1
+        EventRouter.order[owner] = EventRouter.sequence
+
+        for _c in EventRouter.subscriptions.get(owner, []):
+            EventRouter._add_to_tables(owner, _c)
+
+    @staticmethod
+    def set_pathed(owner, pathed=True):
+        """
+        Set / clear the path of the owner's pathed callbacks.  Unpathed
+        callbacks receive every event regardless of the pick.
+        """
+
+        if pathed:
+            EventRouter.cleared.discard(owner)
+
+        else:
+            EventRouter.cleared.add(owner)
+
+        if owner in EventRouter.nodes:
+            EventRouter._set_path_state(owner)
+
+    @staticmethod
+    def _set_path_state(owner):
+        """
+        Update the unpathed state of an active owner
+        """
+
+        if EventRouter.nodes[owner] is None or owner in EventRouter.cleared:
+            EventRouter.unpathed[owner] = True
+
+        else:
+            EventRouter.unpathed.pop(owner, None)
+
+    @staticmethod
+    def set_enabled(owner, pathed=None, local=None):
+        """
+        Switch the owner's pathed / local callbacks on or off
+        """
+
+        for _v, _muted in (
+            (pathed, EventRouter.muted_pathed),
+            (local, EventRouter.muted_local)):
+
+            if _v is None:
+                continue
+
+            if _v:
+                _muted.discard(owner)
+
+            else:
+                _muted.add(owner)
+
+    @staticmethod
+    def is_registered(owner):
+        """
+        Return whether or not the owner has been activated
+        """
+
+        return owner in EventRouter.nodes
+
+    @staticmethod
+    def remove(owner):
+        """
+        Remove the owner and all of its callbacks
+        """
+
+        for _c in EventRouter.subscriptions.pop(owner, []):
+            EventRouter._remove_from_tables(owner, _c)
+
+        _key = EventRouter.nodes.pop(owner, None)
+
+        if _key is not None and EventRouter.paths.get(_key) is owner:
+            del EventRouter.paths[_key]
+
+        EventRouter.unpathed.pop(owner, None)
+        EventRouter.roots.pop(owner, None)
+        EventRouter.order.pop(owner, None)
+        EventRouter.visibility.pop(owner, None)
+        EventRouter.cleared.discard(owner)
+        EventRouter.muted_pathed.discard(owner)
+        EventRouter.muted_local.discard(owner)
+
+    @staticmethod
+    def is_visible(owner):
+        """
+        Return whether or not the owner's root is reachable from the scene
+        root without passing a switch which is off
+        """
+
+        _visible = EventRouter.visibility.get(owner)
+
+        if _visible is None:
+
+            _visible = EventRouter._get_visibility(owner)
+            EventRouter.visibility[owner] = _visible
+
+        return _visible
+
+    @staticmethod
+    def _get_visibility(owner):
+        """
+        Test the switches between the scene root and the owner's root,
+        watching them for changes
+        """
+
+        _root = EventRouter.roots.get(owner)
+
+        if _root is None or EventRouter.scene_root is None:
+            return True
+
+        _switches = PathIndex.get_switches(_root, EventRouter.scene_root)
+
+        #roots which are not indexed are not known to be hidden
+        if _switches is None:
+            return True
+
+        #the owner's callbacks lay under its root, so a switched root
+        #which is off hides them as well
+        if isinstance(_root, coin.SoSwitch):
+            _switches.append((_root, None))
+
+        for _switch, _idx in _switches:
+            EventRouter._watch_switch(_switch)
+
+        return all(
+            PathIndex.is_active_child(_switch, _idx)
+                for _switch, _idx in _switches
+        )
+
+    @staticmethod
+    def _watch_switch(switch):
+        """
+        Attach a sensor to the switch's whichChild field, if not already
+        done.  Sensors of deleted switches are detached by Coin and are
+        replaced if the node key is reused.
+        """
+
+        _key = get_node_key(switch)
+        _sensor = EventRouter.switch_sensors.get(_key)
+
+        if _sensor is not None and _sensor.getAttachedField() is not None:
+            return
+
+        #immediate, so the next event sees the change
+        _sensor = coin.SoFieldSensor(EventRouter._switch_changed, None)
+        _sensor.setPriority(0)
+        _sensor.attach(switch.whichChild)
+
+        EventRouter.switch_sensors[_key] = _sensor
+
+    @staticmethod
+    def _switch_changed(user_data, sensor):
+        """
+        Sensor callback dropping cached visibility when a switch changes
+        """
+
+        EventRouter.visibility.clear()
+        EventRouter.switch_version += 1
+
+        #drop sensors of deleted switches
+        for _key, _sensor in list(EventRouter.switch_sensors.items()):
+
+            if _sensor.getAttachedField() is None:
+                del EventRouter.switch_sensors[_key]
+
+    @staticmethod
+    def get_picked_owners(event_cb):
+        """
+        Return the owners with path nodes on the picked path, from the
+        picked node up
+        """
+
+        if not EventRouter.paths:
+            return []
+
+        _point = event_cb.getPickedPoint()
+
+        if not _point:
+            return []
+
+        _path = _point.getPath()
+        _owners = []
+
+        for _i in range(_path.getLength() - 1, -1, -1):
+
+            _owner = EventRouter.paths.get(get_node_key(_path.getNode(_i)))
+
+            if _owner is not None:
+                _owners.append(_owner)
+
+        return _owners
+
+    @staticmethod
+    def dispatch(type_name, user_data, event_cb):
+        """
+        Event callback of the router node for an event type
+        """
+
+        _cb = EventRouter.global_callbacks.get(type_name)
+
+        if _cb:
+            _cb(None, event_cb)
+
+        _pathed = EventRouter.pathed.get(type_name) or {}
+        _local = EventRouter.local.get(type_name) or {}
+
+        if not (_pathed or _local):
+            return
+
+        _picked = ()
+        _owners = set(_local)
+
+        if _pathed:
+
+            _picked = set(EventRouter.get_picked_owners(event_cb))
+
+            _owners.update(
+                _k for _k in _picked | set(EventRouter.unpathed)
+                    if _k in _pathed
+            )
+
+        for _owner in sorted(_owners, key=EventRouter.get_order):
+
+            _callbacks = []
+
+            if _owner not in EventRouter.muted_pathed and (
+                _owner in _picked or _owner in EventRouter.unpathed):
+
+                _callbacks += _pathed.get(_owner, ())
+
+            if _owner not in EventRouter.muted_local:
+                _callbacks += _local.get(_owner, ())
+
+            if not _callbacks:
+                continue
+
+            #picked owners are visible, others are tested
+            if _owner not in _picked and not EventRouter.is_visible(_owner):
+                continue
+
+            if event_cb.isHandled():
+                return
+
+            for _ref in _callbacks:
+
+                _fn = _ref()
+
+                if _fn is not None:
+                    _fn(None, event_cb)
+
+    @staticmethod
+    def get_order(owner):
+        """
+        Return the dispatch order of an owner
+        """
+
+        return EventRouter.order.get(owner, 0)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Opt-in latency instrumentation for drag event processing
+"""
+
+import time
+
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+
+from .coin_enums import LatencyStage
+
+class latency:
+    """
+    Rolling timings of the stages between a mouse event and the
+    coordinate writes it causes, in milliseconds.
+
+    Stage timings are recorded with latency.record() when enabled.
+    The end-to-end time from the last mouse event to the last coordinate
+    write is recorded when the todo queue drains.
+    """
+
+    enabled = False
+
+    #number of samples kept per stage
+    window = 1000
+
+    samples = {_s: deque(maxlen=1000) for _s in LatencyStage.ALL}
+
+    #time of the last unmatched mouse event and the last commit
+    event_time = None
+    commit_time = None
+
+    @staticmethod
+    def enable(enabled=True, window=None):
+        """
+        Enable / disable instrumentation, optionally resizing the window
+        """
+
+        latency.enabled = enabled
+
+        if window and window != latency.window:
+
+            latency.window = window
+            latency.reset()
+
+    @staticmethod
+    def reset():
+        """
+        Clear all samples
+        """
+
+        latency.samples = {
+            _s: deque(maxlen=latency.window) for _s in LatencyStage.ALL}
+
+        latency.event_time = None
+        latency.commit_time = None
+
+    @staticmethod
+    def now():
+        """
+        Return the current time in seconds
+        """
+
+        return time.perf_counter()
+
+    @staticmethod
+    def start_event():
+        """
+        Mark the arrival of a mouse event, returning the time
+        """
+
+        latency.event_time = time.perf_counter()
+
+        return latency.event_time
+
+    @staticmethod
+    def record(stage, start):
+        """
+        Record the time elapsed since start for the stage
+        """
+
+        _now = time.perf_counter()
+
+        latency.samples[stage].append((_now - start) * 1000.0)
+
+        if stage == LatencyStage.COMMIT:
+            latency.commit_time = _now
+
+    @staticmethod
+    def end_tick():
+        """
+        Record the end-to-end time if the last mouse event has been
+        followed by a commit.  Called when the todo queue drains.
+        """
+
+        if latency.event_time is None or latency.commit_time is None:
+            return
+
+        if latency.commit_time < latency.event_time:
+            return
+
+        latency.samples[LatencyStage.TOTAL].append(
+            (latency.commit_time - latency.event_time) * 1000.0)
+
+        latency.event_time = None
+
+    @staticmethod
+    def percentiles(stage, percents=(50, 90, 99)):
+        """
+        Return the percentiles of the stage samples, None if no samples
+        """
+
+        _samples = latency.samples[stage]
+
+        if not _samples:
+            return None
+
+        return tuple(np.percentile(np.fromiter(_samples, float), percents))
+
+    @staticmethod
+    def histogram(stage, bins=20):
+        """
+        Return the (counts, bin edges) histogram of the stage samples
+        """
+
+        return np.histogram(np.fromiter(latency.samples[stage], float), bins)
+
+    @staticmethod
+    def report():
+        """
+        Return a dict of stage -> SimpleNamespace of the sample count and
+        the 50th / 90th / 99th percentile and maximum timings
+        """
+
+        _result = {}
+
+        for _s in LatencyStage.ALL:
+
+            _p = latency.percentiles(_s)
+
+            if _p is None:
+                continue
+
+            _result[_s] = SimpleNamespace(
+                count=len(latency.samples[_s]),
+                p50=_p[0], p90=_p[1], p99=_p[2],
+                max=max(latency.samples[_s])
+            )
+
+        return _result
@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Scenegraph path index
+"""
+
+from pivy import coin
+
+from .coin_enums import NodeSearch
+
+def get_node_key(node):
+    """
+    Return a hashable key identifying the underlying Coin node, rather than
+    the python wrapper, which may differ between calls for the same node
+    """
+
+    try:
+        return int(node.this)
+
+    except (AttributeError, TypeError):
+        return id(node)
+
+class PathIndex:
+    """
+    Index of scenegraph nodes by identity, name and type.
+
+    Nodes are registered with their parent as they are inserted and removed
+    through coin_utils, so paths can be built by walking up the parent links
+    rather than traversing the graph from the root with a SoSearchAction.
+
+    Nodes which are not reachable through the index (unindexed, moved
+    elsewhere, shared between parents, or hidden by a switch) are not found,
+    in which case callers fall back to a search action.
+
+    The index holds one wrapper per node and links nodes to their parents
+    by key, so it is the only holder of a node which has been dropped from
+    the scenegraph.  prune() releases those nodes, and runs whenever the
+    number of registrations since the last prune exceeds the index size.
+    """
+
+    #node key -> node, for indexed nodes and the parents of indexed roots
+    nodes = {}
+
+    #indexed node key -> parent node key
+    parents = {}
+
+    #keys of nodes registered under more than one parent
+    shared = set()
+
+    #node name -> set of node keys
+    names = {}
+
+    #type name -> [SoType, set of node keys]
+    types = {}
+
+    #maximum number of candidates for index queries on local roots
+    local_limit = 16
+
+    #registrations since the last prune, and the minimum between prunes
+    registered = 0
+    prune_limit = 256
+
+    @staticmethod
+    def add(node, parent):
+        """
+        Register a node and its subgraph under the passed parent
+        """
+
+        PathIndex._register(node, parent)
+
+        if isinstance(node, coin.SoGroup):
+
+            _stack = [node]
+
+            while _stack:
+
+                _parent = _stack.pop()
+
+                for _i in range(0, _parent.getNumChildren()):
+
+                    _child = _parent.getChild(_i)
+
+                    PathIndex._register(_child, _parent)
+
+                    if isinstance(_child, coin.SoGroup):
+                        _stack.append(_child)
+
+        if PathIndex.registered > \
+            max(len(PathIndex.parents), PathIndex.prune_limit):
+
+            PathIndex.prune()
+
+    @staticmethod
+    def remove(node, parent=None):
+        """
+        Unregister a node and its subgraph.  If the parent is specified,
+        the node is only removed if it is indexed under that parent.
+        """
+
+        _k = get_node_key(node)
+
+        if parent is not None:
+
+            if PathIndex.parents.get(_k) != get_node_key(parent):
+                return
+
+        _stack = [node]
+
+        while _stack:
+
+            _node = _stack.pop()
+
+            PathIndex._unregister(get_node_key(_node))
+
+            if not isinstance(_node, coin.SoGroup):
+                continue
+
+            for _i in range(0, _node.getNumChildren()):
+                _stack.append(_node.getChild(_i))
+
+    @staticmethod
+    def remove_children(parent):
+        """
+        Unregister all children of the passed node
+        """
+
+        for _i in range(0, parent.getNumChildren()):
+            PathIndex.remove(parent.getChild(_i), parent)
+
+    @staticmethod
+    def prune():
+        """
+        Release the nodes which only the index still references, and the
+        nodes indexed beneath them.  A node in the scenegraph is also
+        referenced by its parent, so only nodes dropped from the graph
+        without being unregistered are released.
+        """
+
+        PathIndex.registered = 0
+
+        _children = {}
+
+        for _k, _pk in PathIndex.parents.items():
+            _children.setdefault(_pk, []).append(_k)
+
+        for _k in list(PathIndex.nodes):
+
+            _node = PathIndex.nodes.get(_k)
+
+            if _node is None or _node.getRefCount() > 1:
+                continue
+
+            #keys are node addresses which are reused once the node is
+            #released, so the entries beneath it are dropped first
+            _stack = [_k]
+
+            while _stack:
+
+                _key = _stack.pop()
+                _stack += _children.pop(_key, [])
+
+                PathIndex._unregister(_key)
+
+    @staticmethod
+    def _register(node, parent):
+        """
+        Add a single node to the index
+        """
+
+        _k = get_node_key(node)
+        _pk = get_node_key(parent)
+        _shared = False
+
+        if _k in PathIndex.parents:
+
+            _previous = PathIndex.nodes.get(PathIndex.parents[_k])
+
+            #a node still under another parent has more than one path
+            if PathIndex.parents[_k] != _pk and _previous is not None:
+                _shared = _previous.findChild(node) >= 0
+
+            PathIndex._unregister(_k)
+
+        PathIndex.registered += 1
+
+        PathIndex.nodes[_k] = node
+        PathIndex.parents[_k] = _pk
+
+        if _pk not in PathIndex.nodes:
+            PathIndex.nodes[_pk] = parent
+
+        if _shared:
+            PathIndex.shared.add(_k)
+
+        _name = node.getName().getString()
+
+        if _name:
+            PathIndex.names.setdefault(_name, set()).add(_k)
+
+        _type = node.getTypeId()
+        _entry = PathIndex.types.get(_type.getName().getString())
+
+        if not _entry:
+            _entry = [_type, set()]
+            PathIndex.types[_type.getName().getString()] = _entry
+
+        _entry[1].add(_k)
+
+    @staticmethod
+    def _unregister(key):
+        """
+        Remove a single node from the index by its key
+        """
+
+        _node = PathIndex.nodes.pop(key, None)
+
+        if PathIndex.parents.pop(key, None) is None or _node is None:
+            return
+
+        PathIndex.shared.discard(key)
+
+        _keys = PathIndex.names.get(_node.getName().getString())
+
+        if _keys:
+            _keys.discard(key)
+
+        _entry = PathIndex.types.get(_node.getTypeId().getName().getString())
+
+        if _entry:
+            _entry[1].discard(key)
+
+    @staticmethod
+    def _get_chain(node, root, switches=None):
+        """
+        Return the list of nodes and child indices from the root to the node
+        as ([nodes], (indices)), or None if the node is not reachable from
+        the root through the index, is shared between parents, or is hidden
+        by a switch.
+
+        switches - if a list is passed, the (switch, child index) pairs on
+            the chain are added to it and switch states are not tested
+        """
+
+        _root = get_node_key(root)
+        _k = get_node_key(node)
+        _node = node
+        _nodes = [node]
+        _indices = []
+
+        while _k != _root:
+
+            if _k in PathIndex.shared:
+                return None
+
+            _pk = PathIndex.parents.get(_k)
+
+            if _pk is None:
+                return None
+
+            _parent = PathIndex.nodes.get(_pk)
+
+            if _parent is None:
+                return None
+
+            _idx = _parent.findChild(_node)
+
+            #stale link - the node has been moved or removed elsewhere
+            if _idx < 0:
+                return None
+
+            #searches only traverse active switch children
+            if isinstance(_parent, coin.SoSwitch):
+
+                if switches is not None:
+                    switches.append((_parent, _idx))
+
+                elif not PathIndex.is_active_child(_parent, _idx):
+                    return None
+
+            _nodes.append(_parent)
+            _indices.append(_idx)
+            _node = _parent
+            _k = _pk
+
+        return _nodes[::-1], tuple(_indices[::-1])
+
+    @staticmethod
+    def is_under(node, roots):
+        """
+        Return whether or not the node is indexed under one of the roots,
+        passed as a set of node keys, regardless of switch states
+        """
+
+        _k = get_node_key(node)
+
+        while _k not in roots:
+
+            _k = PathIndex.parents.get(_k)
+
+            if _k is None:
+                return False
+
+        return True
+
+    @staticmethod
+    def get_path(node, root):
+        """
+        Return a SoPath from the root to the node, or None
+        """
+
+        _chain = PathIndex._get_chain(node, root)
+
+        if not _chain:
+            return None
+
+        _nodes, _indices = _chain
+
+        _path = coin.SoPath(root)
+
+        for _i in _indices:
+            _path.append(_i)
+
+        return _path
+
+    @staticmethod
+    def is_active_child(switch, index):
+        """
+        Return whether or not the switch traverses the child at the index,
+        or any child if the index is None
+        """
+
+        _which = switch.whichChild.getValue()
+
+        if index is None:
+            return _which != -1
+
+        return not (_which == -1 or (_which >= 0 and _which != index))
+
+    @staticmethod
+    def get_switches(node, root):
+        """
+        Return the (switch, child index) pairs on the index path from the
+        root to the node regardless of their states, or None if the node
+        is not reachable from the root through the index
+        """
+
+        _switches = []
+
+        if PathIndex._get_chain(node, root, _switches) is None:
+            return None
+
+        return _switches
+
+    @staticmethod
+    def is_visible(node, root):
+        """
+        Return whether or not the node is reachable from the root through
+        the index without passing a switch which hides it
+        """
+
+        return PathIndex._get_chain(node, root) is not None
+
+    @staticmethod
+    def is_indexed(node):
+        """
+        Return whether or not the node is indexed
+        """
+
+        return get_node_key(node) in PathIndex.parents
+
+    @staticmethod
+    def is_top(node):
+        """
+        Return whether or not the node is an indexed root, i.e. its parent
+        is not indexed
+        """
+
+        _parent = PathIndex.parents.get(get_node_key(node))
+
+        return _parent is not None and _parent not in PathIndex.parents
+
+    @staticmethod
+    def find(root, name='', node_type=None, interest=NodeSearch.FIRST):
+        """
+        Find nodes under the root by name or type, in traversal order.
+
+        Returns the node (FIRST / LAST) or list of nodes (ALL), or False if
+        the index cannot answer the query.  Nodes added through the Coin API
+        directly are not indexed, so finding no nodes is not conclusive and
+        also returns False.
+
+        Candidates are every indexed node of the name / type in the scene,
+        so queries on local roots with more than local_limit candidates
+        are left to a search action over the root's subtree.
+        """
+
+        if not PathIndex.is_indexed(root):
+            return False
+
+        _sets = []
+
+        if name:
+            _sets = [PathIndex.names.get(name, set())]
+
+        elif node_type:
+
+            _sets = [
+                _k for _type, _k in PathIndex.types.values()
+                    if _type.isDerivedFrom(node_type)
+            ]
+
+        if sum([len(_k) for _k in _sets]) > PathIndex.local_limit\
+            and not PathIndex.is_top(root):
+
+            return False
+
+        _found = []
+
+        for _keys in _sets:
+
+            for _k in _keys:
+
+                _chain = PathIndex._get_chain(PathIndex.nodes[_k], root)
+
+                if _chain:
+                    _found.append((_chain[1], _chain[0][-1]))
+
+        if not _found:
+            return False
+
+        _found.sort(key=lambda _v: _v[0])
+
+        if interest == NodeSearch.ALL:
+            return [_v[1] for _v in _found]
+
+        if interest == NodeSearch.LAST:
+            return _found[-1][1]
+
+        return _found[0][1]
+
+    @staticmethod
+    def clear():
+        """
+        Clear the index
+        """
+
+        PathIndex.nodes = {}
+        PathIndex.parents = {}
+        PathIndex.shared = set()
+        PathIndex.names = {}
+        PathIndex.types = {}
+        PathIndex.registered = 0
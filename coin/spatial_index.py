@@ -0,0 +1,744 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Uniform grid spatial indices for geometry queries in the XY plane
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+def get_cell_ranges(mins, maxs, cell_size):
+    """
+    Return the (N,2) arrays of the first and last grid cells covered by
+    each of the (N,2) bounding boxes
+    """
+
+    return (
+        np.floor(mins / cell_size).astype(np.int64),
+        np.floor(maxs / cell_size).astype(np.int64)
+    )
+
+def get_box_cells(mins, maxs, cell_size):
+    """
+    Return the (box index, cell x, cell y) arrays of every grid cell
+    overlapped by each of the (N,2) bounding boxes
+    """
+
+    _lo, _hi = get_cell_ranges(mins, maxs, cell_size)
+
+    _span = _hi - _lo + 1
+    _counts = _span[:, 0] * _span[:, 1]
+
+    #enumerate every (box, cell) pair without a python loop
+    _ids = np.repeat(np.arange(len(mins)), _counts)
+    _offsets = np.arange(_counts.sum()) - np.repeat(np.cumsum(_counts) - _counts, _counts)
+
+    _cx = _lo[_ids, 0] + _offsets % _span[_ids, 0]
+    _cy = _lo[_ids, 1] + _offsets // _span[_ids, 0]
+
+    return _ids, _cx, _cy
+
+def get_segment_cells(starts, ends, cell_size):
+    """
+    Return the (segment index, cell x, cell y) arrays of the grid cells
+    crossed by each of the (N,2) segments.
+
+    Segments are split into pieces no longer than the cell size.  A piece
+    can only cross the cells of its own bounding box, so each segment
+    covers a number of cells proportional to its length, rather than to
+    the area of its bounding box.
+    """
+
+    _deltas = ends - starts
+    _lengths = np.hypot(_deltas[:, 0], _deltas[:, 1])
+    _pieces = np.maximum(np.ceil(_lengths / cell_size), 1).astype(np.int64)
+
+    _ids = np.repeat(np.arange(len(starts)), _pieces)
+    _offsets = np.arange(_pieces.sum())\
+        - np.repeat(np.cumsum(_pieces) - _pieces, _pieces)
+
+    #piece end points as parameters along each segment
+    _t = _offsets / _pieces[_ids]
+    _u = (_offsets + 1) / _pieces[_ids]
+
+    _a = starts[_ids] + _t[:, None] * _deltas[_ids]
+    _b = starts[_ids] + _u[:, None] * _deltas[_ids]
+
+    _pieces, _cx, _cy = get_box_cells(
+        np.minimum(_a, _b), np.maximum(_a, _b), cell_size)
+
+    return _ids[_pieces], _cx, _cy
+
+def group_cells(ids, cx, cy):
+    """
+    Return a dict of grid cell (ix, iy) -> array of the unique indices
+    listed for the cell
+    """
+
+    if not len(ids):
+        return {}
+
+    _order = np.lexsort((ids, cy, cx))
+    _cx, _cy, _ids = cx[_order], cy[_order], ids[_order]
+
+    #drop repeated (cell, index) pairs
+    _keep = np.r_[True,
+        (np.diff(_cx) != 0) | (np.diff(_cy) != 0) | (np.diff(_ids) != 0)]
+
+    _cx, _cy, _ids = _cx[_keep], _cy[_keep], _ids[_keep]
+
+    _breaks = np.flatnonzero((np.diff(_cx) != 0) | (np.diff(_cy) != 0)) + 1
+    _starts = np.r_[0, _breaks]
+
+    return {
+        (int(_cx[_s]), int(_cy[_s])): _v\
+            for _s, _v in zip(_starts, np.split(_ids, _breaks))
+    }
+
+def build_grid(mins, maxs, cell_size):
+    """
+    Return a dict of grid cell (ix, iy) -> array of the indices of the
+    bounding boxes which overlap the cell
+
+    mins, maxs - (N,2) arrays of the bounding box corners
+    cell_size - the grid cell size
+    """
+
+    return group_cells(*get_box_cells(mins, maxs, cell_size))
+
+class SegmentIndex():
+    """
+    Uniform grid index of the segments of a polyline for nearest-segment
+    projection of points in the XY plane
+    """
+
+    def __init__(self, points, cell_size=None):
+        """
+        Constructor
+
+        points - the polyline vertices as 2 or 3-tuples or an (N,3) array
+        cell_size - grid cell size, the mean segment length by default
+        """
+
+        _points = np.asarray(points, dtype=np.float64)
+
+        if _points.ndim == 2 and _points.shape[1] == 2:
+            _points = np.c_[_points, np.zeros(len(_points))]
+
+        _points = _points.reshape(-1, 3)
+
+        self.starts = _points[:-1]
+        self.deltas = _points[1:] - _points[:-1]
+        self.length_sq = np.einsum(
+            'ij,ij->i', self.deltas[:, :2], self.deltas[:, :2])
+
+        self.grid = {}
+        self.cell_size = cell_size
+        self.extent = None
+
+        if not len(self.starts):
+            return
+
+        _ends = self.starts + self.deltas
+
+        _mins = np.minimum(self.starts[:, :2], _ends[:, :2])
+        _maxs = np.maximum(self.starts[:, :2], _ends[:, :2])
+
+        if not self.cell_size:
+            self.cell_size = float(np.sqrt(self.length_sq).mean())
+
+        if not self.cell_size:
+            self.cell_size = 1.0
+
+        self.grid = group_cells(*get_segment_cells(
+            self.starts[:, :2], _ends[:, :2], self.cell_size))
+
+        _lo, _hi = get_cell_ranges(
+            _mins.min(axis=0), _maxs.max(axis=0), self.cell_size)
+
+        self.extent = (_lo, _hi)
+
+    def __len__(self):
+
+        return len(self.starts)
+
+    def get_candidates(self, cell, ring):
+        """
+        Return the indices of segments in the cells on the square ring
+        at the passed distance from the cell
+        """
+
+        _x, _y = cell
+        _cells = []
+
+        if not ring:
+            _cells = [(_x, _y)]
+
+        else:
+
+            for _i in range(-ring, ring + 1):
+                _cells += [(_x + _i, _y - ring), (_x + _i, _y + ring)]
+
+            for _i in range(-ring + 1, ring):
+                _cells += [(_x - ring, _y + _i), (_x + ring, _y + _i)]
+
+        _found = [self.grid[_c] for _c in _cells if _c in self.grid]
+
+        if not _found:
+            return None
+
+        return np.concatenate(_found)
+
+    def project(self, point, indices):
+        """
+        Project the point onto the indexed segments, returning the
+        projected points and their XY distances from the point
+        """
+
+        _p = np.asarray(point[:2], dtype=np.float64)
+        _s = self.starts[indices]
+        _d = self.deltas[indices]
+        _len_sq = self.length_sq[indices]
+
+        _t = np.einsum('ij,ij->i', _p - _s[:, :2], _d[:, :2])
+        _t = np.divide(_t, _len_sq, out=np.zeros_like(_t), where=_len_sq > 0.0)
+        _t = np.clip(_t, 0.0, 1.0)
+
+        _proj = _s + _t[:, None] * _d
+        _dist = np.hypot(_proj[:, 0] - _p[0], _proj[:, 1] - _p[1])
+
+        return _proj, _dist
+
+    def nearest(self, point, max_distance=None):
+        """
+        Return the projection of the point onto the nearest segment as
+        (point, segment index, distance), or None if no segment lies within
+        the maximum distance
+        """
+
+        if not self.grid:
+            return None
+
+        _cell = tuple(
+            np.floor(np.asarray(point[:2]) / self.cell_size).astype(int))
+
+        _lo, _hi = self.extent
+
+        #rings beyond this cover no indexed cells
+        _max_ring = int(max(
+            _cell[0] - _lo[0], _hi[0] - _cell[0],
+            _cell[1] - _lo[1], _hi[1] - _cell[1], 0))
+
+        if max_distance is not None:
+            _max_ring = min(_max_ring, int(max_distance / self.cell_size) + 1)
+
+        _best = None
+        _ring = 0
+        _cost = 0
+
+        while _ring <= _max_ring:
+
+            #segments in further rings are at least this far away
+            if _best and _best[2] <= (_ring - 1) * self.cell_size:
+                break
+
+            #once the cells visited outnumber the segments, a vectorized
+            #scan of every segment is cheaper than walking further rings
+            _cost += max(8 * _ring, 1)
+
+            if _cost > len(self):
+                _ids = np.arange(len(self))
+                _ring = _max_ring + 1
+
+            else:
+                _ids = self.get_candidates(_cell, _ring)
+                _ring += 1
+
+            if _ids is None:
+                continue
+
+            _proj, _dist = self.project(point, _ids)
+            _i = int(np.argmin(_dist))
+
+            if _best is None or _dist[_i] < _best[2]:
+                _best = (tuple(_proj[_i].tolist()), int(_ids[_i]), float(_dist[_i]))
+
+        if _best is None:
+            return None
+
+        if max_distance is not None and _best[2] > max_distance:
+            return None
+
+        return _best
+
+def get_cell_keys(cells):
+    """
+    Return int64 keys for an (N,2) array of integer grid cells
+    """
+
+    return (cells[:, 0].astype(np.int64) << 32) + (cells[:, 1] & 0xffffffff)
+
+class PointIndex():
+    """
+    Hashed grid index of point sets by owner for nearest-point queries in
+    the XY plane.
+
+    Points of all owners are packed into arrays sorted by grid cell.
+    Owners updated since the last pack are masked out of the packed
+    arrays and searched directly, so frequent updates to a few owners
+    (e.g. during a drag) do not require the packed arrays to be rebuilt.
+    Queries never rebuild a packed index - see refresh().
+    """
+
+    def __init__(self, cell_size=1.0, rebuild_ratio=0.1):
+        """
+        Constructor
+
+        cell_size - grid cell size
+        rebuild_ratio - fraction of updated points at which the packed
+            arrays are rebuilt
+        """
+
+        self.cell_size = cell_size
+        self.rebuild_ratio = rebuild_ratio
+
+        #owner -> (N,3) point array
+        self.owners = {}
+
+        #owner -> integer id used in the packed arrays
+        self.owner_ids = {}
+        self.id_owners = []
+
+        #owners updated or removed since the last pack
+        self.dirty = set()
+
+        self.packed = None
+        self.dirty_points = None
+
+        #rings -> cell offsets, see get_cell_offsets()
+        self.cell_offsets = {}
+
+    def __len__(self):
+
+        return sum([len(_v) for _v in self.owners.values()])
+
+    def update(self, owner, points):
+        """
+        Set the points of the owner
+        """
+
+        _points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        self.owners[owner] = _points
+        self.dirty.add(owner)
+        self.dirty_points = None
+
+    def remove(self, owner):
+        """
+        Remove the points of the owner
+        """
+
+        if self.owners.pop(owner, None) is None:
+            return
+
+        self.dirty.add(owner)
+        self.dirty_points = None
+
+    def clear(self):
+        """
+        Remove all points
+        """
+
+        self.owners = {}
+        self.owner_ids = {}
+        self.id_owners = []
+        self.dirty = set()
+        self.packed = None
+        self.dirty_points = None
+
+    def set_cell_size(self, cell_size):
+        """
+        Set the grid cell size, forcing the packed arrays to be rebuilt
+        """
+
+        self.cell_size = cell_size
+        self.packed = None
+
+    def refresh(self, cell_size=None):
+        """
+        Rebuild the packed arrays if the cell size changes or too many
+        points have been updated since the last pack.  Queries only pack
+        the index on first use, so call this outside of time-critical
+        paths, e.g. at the start of a drag.
+
+        cell_size - new grid cell size, None to keep the current size
+        """
+
+        if cell_size and cell_size != self.cell_size:
+            self.set_cell_size(cell_size)
+
+        if self.packed is None or len(self.get_dirty_points()[0])\
+            > self.rebuild_ratio * max(len(self.packed[0]), 1):
+
+            self.pack()
+
+    def get_cell_offsets(self, rings):
+        """
+        Return the (N,2) array of cell offsets within the number of rings
+        """
+
+        _offsets = self.cell_offsets.get(rings)
+
+        if _offsets is None:
+
+            _range = np.arange(-rings, rings + 1)
+            _offsets = np.stack(np.meshgrid(_range, _range), -1).reshape(-1, 2)
+
+            self.cell_offsets[rings] = _offsets
+
+        return _offsets
+
+    def pack(self):
+        """
+        Pack the points of all owners into arrays sorted by grid cell
+        """
+
+        self.owner_ids = {}
+        self.id_owners = []
+        self.dirty = set()
+        self.dirty_points = None
+
+        _points = []
+        _ids = []
+        _indices = []
+
+        for _k, _v in self.owners.items():
+
+            self.owner_ids[_k] = len(self.id_owners)
+            self.id_owners.append(_k)
+
+            _points.append(_v)
+            _ids.append(np.full(len(_v), self.owner_ids[_k]))
+            _indices.append(np.arange(len(_v)))
+
+        if not _points:
+            _points, _ids, _indices = [np.zeros((0, 3))], [[]], [[]]
+
+        _points = np.concatenate(_points)
+        _keys = get_cell_keys(
+            np.floor(_points[:, :2] / self.cell_size).astype(np.int64))
+
+        _order = np.argsort(_keys, kind='stable')
+
+        self.packed = (
+            _keys[_order],
+            _points[_order],
+            np.concatenate(_ids).astype(np.int64)[_order],
+            np.concatenate(_indices).astype(np.int64)[_order]
+        )
+
+    def get_dirty_points(self):
+        """
+        Return the points of the owners updated since the last pack as
+        (points, owners, owner slot per point, index per point)
+        """
+
+        if self.dirty_points is not None:
+            return self.dirty_points
+
+        _owners = [_k for _k in self.dirty if _k in self.owners]
+        _sizes = [len(self.owners[_k]) for _k in _owners]
+
+        if not sum(_sizes):
+
+            self.dirty_points = (
+                np.zeros((0, 3)), [], np.zeros(0, np.int64),
+                np.zeros(0, np.int64)
+            )
+
+            return self.dirty_points
+
+        self.dirty_points = (
+            np.concatenate([self.owners[_k] for _k in _owners]),
+            _owners,
+            np.repeat(np.arange(len(_owners)), _sizes),
+            np.concatenate([np.arange(_n) for _n in _sizes])
+        )
+
+        return self.dirty_points
+
+    def nearest(self, point, max_distance, exclude=()):
+        """
+        Return the nearest point within the maximum distance as
+        (point, owner, index, distance), or None
+
+        exclude - owners to ignore
+        """
+
+        if self.packed is None:
+            self.pack()
+
+        _rings = int(np.ceil(max_distance / self.cell_size))
+
+        _p = np.asarray(point[:2], dtype=np.float64)
+        _best = None
+
+        #search the packed points in the neighboring cells
+        _keys, _points, _ids, _indices = self.packed
+
+        #once the cells outnumber the points, scan every packed point
+        if (2 * _rings + 1) ** 2 > len(_keys):
+            _rows = np.arange(len(_keys))
+
+        else:
+
+            _cell = np.floor(_p / self.cell_size).astype(np.int64)
+            _cells = get_cell_keys(self.get_cell_offsets(_rings) + _cell)
+
+            _lo = np.searchsorted(_keys, _cells, 'left')
+            _counts = np.searchsorted(_keys, _cells, 'right') - _lo
+
+            #packed rows of all points in the cells
+            _rows = np.arange(int(_counts.sum()))\
+                + np.repeat(_lo - np.cumsum(_counts) + _counts, _counts)
+
+        if len(_rows):
+
+            _skip = [self.owner_ids[_k] for _k in set(exclude) | self.dirty\
+                if _k in self.owner_ids]
+
+            if _skip:
+
+                _mask = np.zeros(len(self.id_owners), dtype=bool)
+                _mask[_skip] = True
+
+                _rows = _rows[~_mask[_ids[_rows]]]
+
+            if len(_rows):
+
+                _dist = np.hypot(*(_points[_rows, :2] - _p).T)
+                _i = int(np.argmin(_dist))
+
+                if _dist[_i] <= max_distance:
+
+                    _r = _rows[_i]
+                    _best = (
+                        tuple(_points[_r].tolist()),
+                        self.id_owners[_ids[_r]], int(_indices[_r]),
+                        float(_dist[_i])
+                    )
+
+        #search the points of owners updated since the last pack
+        _points, _owners, _slots, _indices = self.get_dirty_points()
+
+        if len(_points):
+
+            _dist = np.hypot(*(_points[:, :2] - _p).T)
+
+            _skip = [_i for _i, _k in enumerate(_owners) if _k in exclude]
+
+            if _skip:
+                _dist[np.isin(_slots, _skip)] = np.inf
+
+            _i = int(np.argmin(_dist))
+
+            if _dist[_i] <= max_distance\
+                and (_best is None or _dist[_i] < _best[3]):
+
+                _best = (
+                    tuple(_points[_i].tolist()), _owners[_slots[_i]],
+                    int(_indices[_i]), float(_dist[_i])
+                )
+
+        return _best
+
+class BoxIndex():
+    """
+    Uniform grid index of the XY bounding boxes of point sets by owner
+    for rectangle queries.
+
+    As with PointIndex, boxes updated since the last pack are masked out
+    of the grid and tested directly until the next pack.
+    """
+
+    def __init__(self, rebuild_ratio=0.1):
+        """
+        Constructor
+
+        rebuild_ratio - fraction of updated boxes at which the grid is
+            rebuilt
+        """
+
+        self.rebuild_ratio = rebuild_ratio
+
+        #owner -> (min x, min y, max x, max y)
+        self.owners = {}
+
+        #owners updated or removed since the last pack
+        self.dirty = set()
+
+        self.packed = None
+
+    def __len__(self):
+
+        return len(self.owners)
+
+    def update(self, owner, points):
+        """
+        Set the bounding box of the owner from its points
+        """
+
+        _points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        if not len(_points):
+            self.remove(owner)
+            return
+
+        self.owners[owner] = np.r_[
+            _points[:, :2].min(axis=0), _points[:, :2].max(axis=0)]
+
+        self.dirty.add(owner)
+
+    def remove(self, owner):
+        """
+        Remove the bounding box of the owner
+        """
+
+        if self.owners.pop(owner, None) is None:
+            return
+
+        self.dirty.add(owner)
+
+    def clear(self):
+        """
+        Remove all boxes
+        """
+
+        self.owners = {}
+        self.dirty = set()
+        self.packed = None
+
+    def pack(self):
+        """
+        Rebuild the grid from the boxes of all owners
+        """
+
+        self.dirty = set()
+
+        _owners = list(self.owners.keys())
+
+        if not _owners:
+            self.packed = SimpleNamespace(
+                owners=[], ids={}, boxes=np.zeros((0, 4)), grid={},
+                cell_size=1.0)
+
+            return
+
+        _boxes = np.array([self.owners[_k] for _k in _owners])
+
+        #size cells to the larger of the mean box and the mean area per box
+        _size = (_boxes[:, 2:] - _boxes[:, :2]).max(axis=1).mean()
+        _extent = _boxes[:, 2:].max(axis=0) - _boxes[:, :2].min(axis=0)
+
+        _cell_size = max(_size, np.sqrt(_extent.prod() / len(_boxes)))
+
+        if not _cell_size > 0.0:
+            _cell_size = 1.0
+
+        self.packed = SimpleNamespace(
+            owners=_owners,
+            ids={_k: _i for _i, _k in enumerate(_owners)},
+            boxes=_boxes,
+            grid=build_grid(_boxes[:, :2], _boxes[:, 2:], _cell_size),
+            cell_size=_cell_size
+        )
+
+    @staticmethod
+    def test(boxes, lo, hi, contained):
+        """
+        Return the mask of boxes inside (contained) or intersecting the
+        rectangle
+        """
+
+        if contained:
+            return np.all((boxes[:, :2] >= lo) & (boxes[:, 2:] <= hi), axis=1)
+
+        return np.all((boxes[:, :2] <= hi) & (boxes[:, 2:] >= lo), axis=1)
+
+    def query(self, corner_a, corner_b, contained=False):
+        """
+        Return the owners whose boxes intersect the rectangle defined by
+        two corner points, or lie within it if contained is True
+        """
+
+        _lo = np.minimum(corner_a[:2], corner_b[:2]).astype(np.float64)
+        _hi = np.maximum(corner_a[:2], corner_b[:2]).astype(np.float64)
+
+        if self.packed is None\
+            or len(self.dirty) > self.rebuild_ratio * max(len(self.owners), 1):
+
+            self.pack()
+
+        _packed = self.packed
+        _result = []
+
+        if len(_packed.owners):
+
+            _cells = get_cell_ranges(_lo, _hi, _packed.cell_size)
+            _span = _cells[1] - _cells[0] + 1
+
+            #large rectangles test every box rather than every cell
+            if _span.prod() >= len(_packed.owners):
+                _ids = np.arange(len(_packed.owners))
+
+            else:
+
+                _found = [
+                    _packed.grid[(_x, _y)]\
+                        for _x in range(_cells[0][0], _cells[1][0] + 1)\
+                        for _y in range(_cells[0][1], _cells[1][1] + 1)\
+                        if (_x, _y) in _packed.grid
+                ]
+
+                _ids = np.zeros(0, np.int64)
+
+                if _found:
+                    _ids = np.unique(np.concatenate(_found))
+
+            _ids = _ids[self.test(_packed.boxes[_ids], _lo, _hi, contained)]
+
+            _result = [_packed.owners[_i] for _i in _ids.tolist()\
+                if _packed.owners[_i] not in self.dirty]
+
+        #test the boxes of owners updated since the last pack
+        _dirty = [_k for _k in self.dirty if _k in self.owners]
+
+        if _dirty:
+
+            _mask = self.test(
+                np.array([self.owners[_k] for _k in _dirty]), _lo, _hi,
+                contained)
+
+            _result += [_k for _k, _m in zip(_dirty, _mask) if _m]
+
+        return _result
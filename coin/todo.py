@@ -24,9 +24,15 @@ Delayed function execution
 """
 import traceback
 import sys
+import time
+
+from collections import deque
 
 from PySide import QtCore
 
+from .coin_enums import TaskPriority
+from .latency import latency
+
 class todo:
     """
     Delays execution of functions.
@@ -34,34 +40,153 @@ class todo:
     Use todo.delay to schedule scenegraph changes which cannot occur
     during traversals
 
-    List of (function, argument) pairs to be executed by
-    QtCore.QTimer.singleShot(0,doTodo).
+    Queues of (function, argument) pairs executed by
+    QtCore.QTimer.singleShot(0,doTodo).  If a time budget is set, work left
+    when the budget is exceeded rolls over to the next tick, in order.
+
+    INPUT and GEOMETRY calls share one queue and run in the order they were
+    queued, so drag setup / teardown always sees the node insertions,
+    removals and coordinate writes queued before it.  Only COSMETIC calls
+    (style-only updates) may be reordered - they run once the ordered
+    queue is empty.
+
+    Use todo.delay_keyed for calls where only the last one matters
+    (e.g. coordinate updates).  A pending call with the same callable and
+    target is dropped in favor of the new one, which is queued at the end.
     """
 
-    itinerary = []
+    #ordered calls (INPUT / GEOMETRY)
+    itinerary = deque()
+
+    #cosmetic calls, run after the ordered calls
+    cosmetic = deque()
+
     commitlist = []
     afteritinerary = []
 
+    #pending keyed calls, (callable, target) -> itinerary entry
+    keyed = {}
+
+    #enable / disable replacement of pending keyed calls
+    coalesce = True
+
+    #number of keyed calls dropped in favor of a later call
+    collapsed = 0
+
+    #time budget per tick in seconds, None = unlimited
+    budget = 0.016
+
+    #number of ticks which exceeded the budget and rolled work over
+    rollovers = 0
+
+    is_scheduled = False
+
+    @staticmethod
+    def schedule():
+        """
+        Schedule a call to doTasks on the next event loop tick
+        """
+
+        if todo.is_scheduled:
+            return
+
+        todo.is_scheduled = True
+        QtCore.QTimer.singleShot(0, todo.doTasks)
+
+    @staticmethod
+    def pending():
+        """
+        Return the number of queued calls, including replaced keyed calls
+        """
+
+        return len(todo.itinerary) + len(todo.cosmetic)
+
+    @staticmethod
+    def _get_queue(priority):
+        """
+        Return the queue for calls of the passed priority
+        """
+
+        if priority == TaskPriority.COSMETIC:
+            return todo.cosmetic
+
+        return todo.itinerary
+
+    @staticmethod
+    def _next_task():
+        """
+        Pop the next ordered call, or the next cosmetic call if there are
+        no ordered calls left
+        """
+
+        for _queue in (todo.itinerary, todo.cosmetic):
+
+            while _queue:
+
+                _task = _queue.popleft()
+
+                #call replaced by a later keyed call
+                if _task[0] is None:
+                    continue
+
+                if _task[2] is not None:
+                    todo.keyed.pop(_task[2], None)
+
+                return _task
+
+        return None
+
+    @staticmethod
+    def _call(f, arg):
+        """
+        Call a delayed function, reporting any exception
+        """
+
+        try:
+
+            if arg or (arg == False):
+                f(arg)
+
+            else:
+                f()
+
+        except Exception:
+            print (traceback.format_exc(),
+            "\n[Draft.todo.tasks] Unexpected error:", \
+                sys.exc_info()[0], "in ", f, "(", arg, ")"
+            )
+
     @staticmethod
     def doTasks():
 
+        todo.is_scheduled = False
+
+        _start = time.perf_counter()
+
         try:
 
-            for f, arg in todo.itinerary:
+            while True:
 
-                try:
+                _task = todo._next_task()
 
-                    if arg or (arg == False):
-                        f(arg)
+                if not _task:
+                    break
 
-                    else:
-                        f()
+                f, arg, key = _task
 
-                except Exception:
-                    print (traceback.format_exc(),
-                    "\n[Draft.todo.tasks] Unexpected error:", \
-                        sys.exc_info()[0], "in ", f, "(", arg, ")"
-                    )
+                todo._call(f, arg)
+
+                #roll remaining work over to the next tick
+                if todo.budget is not None:
+
+                    if time.perf_counter() - _start > todo.budget:
+
+                        if todo.pending():
+
+                            todo.rollovers += 1
+                            todo.schedule()
+
+                            return
 
         except ReferenceError:
 
@@ -69,8 +194,6 @@ class todo:
                 Debug: DraftGui.todo.doTasks: queue contains a deleted object, skipping
             """)
 
-        todo.itinerary = []
-
         if todo.commitlist:
 
             for name, func in todo.commitlist:
@@ -107,23 +230,73 @@ class todo:
 
         todo.afteritinerary = []
 
+        if latency.enabled:
+            latency.end_tick()
+
+    @staticmethod
+    def delay (f, arg, priority=TaskPriority.GEOMETRY):
+
+        todo.schedule()
+
+        todo._get_queue(priority).append([f, arg, None])
+
+    @staticmethod
+    def delay_keyed (f, arg, target=None, priority=TaskPriority.GEOMETRY):
+        """
+        Delay a call, replacing any pending call with the same callable
+        and target (last write wins)
+        """
+
+        if not todo.coalesce:
+            todo.delay(f, arg, priority)
+            return
+
+        _key = (f, target)
+        _task = todo.keyed.get(_key)
+
+        if _task is not None:
+            _task[0] = None
+            todo.collapsed += 1
+
+        _task = [f, arg, _key]
+
+        todo.schedule()
+
+        todo.keyed[_key] = _task
+        todo._get_queue(priority).append(_task)
+
     @staticmethod
-    def delay (f, arg):
+    def set_budget(milliseconds=None):
+        """
+        Set the time budget per tick, None = unlimited
+        """
 
-        if todo.itinerary == []:
-            QtCore.QTimer.singleShot(0, todo.doTasks)
+        todo.budget = None
 
-        todo.itinerary.append((f,arg))
+        if milliseconds is not None:
+            todo.budget = milliseconds / 1000.0
+
+    @staticmethod
+    def reset_collapsed():
+        """
+        Reset the collapsed call counter, returning the previous count
+        """
+
+        _count = todo.collapsed
+        todo.collapsed = 0
+
+        return _count
 
     @staticmethod
     def delayCommit (cl):
-        QtCore.QTimer.singleShot(0, todo.doTasks)
+
+        todo.schedule()
 
         todo.commitlist = cl
 
     @staticmethod
     def delayAfter (f, arg):
-        if todo.afteritinerary == []:
-            QtCore.QTimer.singleShot(0, todo.doTasks)
+
+        todo.schedule()
 
         todo.afteritinerary.append((f,arg))
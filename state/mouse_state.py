@@ -23,6 +23,10 @@
 Mouse state class
 """
 
+import time
+
+from types import SimpleNamespace
+
 from pivy import coin
 from PySide.QtGui import QCursor
 
@@ -57,9 +61,19 @@ class MouseState(metaclass=Singleton):
 
         self.vector = ()
 
+        self.document = None
         self.object = None
         self.component = ''
 
+        #pick cache and throttling state
+        #interval - minimum time between picks in seconds, 0 = none
+        #distance - minimum screen distance between picks in pixels, 0 = none
+        self.pick = SimpleNamespace(
+            interval=0.0, distance=0, cache_size=1024,
+            version=None, results={}, time=0.0, position=None, info=None,
+            picks=0, cached=0, skipped=0
+        )
+
         self.state = [
             self.button1, self.button2, self.button3,
             self.world_position, self.screen_position
@@ -120,16 +134,18 @@ class MouseState(metaclass=Singleton):
 
     def _update_component_state(self, info):
         """
-        Update the component / object data
+        Update the component / object / document data
         """
 
         #clear state, no info exists
         if not info:
 
+            self.document = None
             self.object = None
             self.component = ''
             return
 
+        self.document = info.get('Document')
         self.object = info.get('Object')
         self.component = info.get('Component')
 
@@ -170,12 +186,83 @@ class MouseState(metaclass=Singleton):
         if self.button1.dragging:
             return
 
-        self._update_component_state(
-            view_state.getObjectInfo(self.screen_position))
+        self._update_component_state(self.get_object_info(view_state))
 
         for _cb in self.callbacks:
             _cb(self)
 
+    def set_pick_throttle(self, interval=0.0, distance=0):
+        """
+        Set the minimum time in milliseconds and / or the minimum screen
+        distance in pixels between picks.  Mouse updates within either
+        limit reuse the last pick.  0 = no limit
+        """
+
+        self.pick.interval = interval / 1000.0
+        self.pick.distance = distance
+
+    def get_object_info(self, view_state):
+        """
+        Return the object info under the mouse, reusing cached picks at the
+        same screen position in an unchanged scene, and the last pick if
+        throttled
+        """
+
+        _pick = self.pick
+        _pos = tuple(self.screen_position)
+        _version = view_state.get_scene_version()
+
+        if _version != _pick.version or len(_pick.results) > _pick.cache_size:
+
+            _pick.version = _version
+            _pick.results = {}
+
+        if _pos in _pick.results:
+
+            _pick.cached += 1
+            return _pick.results[_pos]
+
+        _time = time.perf_counter()
+
+        if _pick.position is not None:
+
+            _throttled = _pick.interval\
+                and _time - _pick.time < _pick.interval
+
+            if not _throttled and _pick.distance:
+
+                _throttled = max(abs(_pos[0] - _pick.position[0]),
+                    abs(_pos[1] - _pick.position[1])) < _pick.distance
+
+            if _throttled:
+
+                _pick.skipped += 1
+                return _pick.info
+
+        _info = view_state.getObjectInfo(_pos)
+
+        _pick.picks += 1
+        _pick.results[_pos] = _info
+        _pick.time = _time
+        _pick.position = _pos
+        _pick.info = _info
+
+        return _info
+
+    def reset_pick_counts(self):
+        """
+        Reset the pick counters, returning the previous
+        (picks, cached, skipped) counts
+        """
+
+        _counts = (self.pick.picks, self.pick.cached, self.pick.skipped)
+
+        self.pick.picks = 0
+        self.pick.cached = 0
+        self.pick.skipped = 0
+
+        return _counts
+
     def set_mouse_position(self, view_state, coord=None):
         """
         Update the mouse cursor position independently
@@ -225,6 +312,7 @@ class MouseState(metaclass=Singleton):
 
         self.vector = None
 
+        self.document = None
         self.object = None
         self.component = ''
 
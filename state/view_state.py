@@ -23,10 +23,15 @@
 View state class
 """
 
+from collections import OrderedDict
+from types import SimpleNamespace
+
 from pivy import coin
 from PySide import QtGui
 
 from ..coin import coin_utils
+from ..coin.event_router import EventRouter
+from ..coin.path_index import PathIndex
 
 from ..support.core.singleton import Singleton
 
@@ -48,14 +53,11 @@ class ViewState(metaclass=Singleton):
 
     view = None
 
-    @staticmethod
-    def global_view_mouse_event(arg):
-        """
-        Global mouse event to update view state
-        """
+    #maximum number of cached matrices
+    matrix_cache_size = 256
 
-        #clear the matrix to force a refresh at the start of every mouse event
-        ViewState()._matrix = None
+    #groups which do not pass transformations on to their siblings
+    _separators = (coin.SoSeparator, coin.SoTransformSeparator)
 
     def __init__(self, view=None):
         """
@@ -77,14 +79,24 @@ class ViewState(metaclass=Singleton):
         self.geo_origin = None
 
         self.sg_root.insertChild(self.root, 0)
+        PathIndex.add(self.root, self.sg_root)
 
         self.active_task_panel = None
         self._matrix = None
 
-        self.callbacks = {}
+        #incremented when tracker geometry is moved, inserted, removed
+        #or shown / hidden, but not when it is restyled
+        self.geometry_version = 0
+
+        #matrices keyed by (node, parent) in least-recently used order,
+        #the sensors which invalidate them when a node affecting their
+        #path changes, and the cache keys which depend on each sensor
+        self._matrix_cache = OrderedDict()
+        self._matrix_sensors = {}
+        self._matrix_dependents = {}
+        self._released_sensors = []
 
-        self.add_mouse_event(
-            ViewState.global_view_mouse_event)
+        self.callbacks = {}
 
     def set_geo_reference(self, system, coordinates):
         """
@@ -95,6 +107,7 @@ class ViewState(metaclass=Singleton):
             self.geo_origin = coin.SoGeoOrigin()
             self.geo_origin.setName('GEO_ORIGIN')
             self.root.insertChild(self.geo_origin, 0)
+            PathIndex.add(self.geo_origin, self.root)
 
         self.geo_origin.geoSystem.setValues(system)
         self.geo_origin.geoCoords.setValue(
@@ -119,28 +132,245 @@ class ViewState(metaclass=Singleton):
         node - the Coin3D SoNode with the desired transformation
         parent - optional - sg root default
         refresh - if false, retrieves last matrix
-        """
 
-        if not parent:
-            parent = self.sg_root
+        Matrices are cached per (node, parent) and only returned while
+        the transformations which produced them are unchanged, so a
+        refresh is served from the cache when it is still valid.
+        """
 
         if not refresh:
             if self._matrix:
                 return self._matrix
 
-        #define the search path
-        _search = coin.SoSearchAction()
-        _search.setNode(node)
-        _search.apply(parent)
+        if not parent:
+            parent = self.sg_root
+
+        _key = (coin_utils.get_node_key(node), coin_utils.get_node_key(parent))
+        _entry = self._matrix_cache.get(_key)
+
+        if _entry is not None:
+
+            if self._is_chain_valid(_entry.chain):
+
+                self._matrix_cache.move_to_end(_key)
+                self._matrix = _entry.matrix
+
+                return _entry.matrix
+
+            self._evict_matrix(_key)
+
+        _path = coin_utils.get_path(node, parent)
+
+        if not _path:
+            return coin.SbMatrix.identity()
 
         #get the matrix for the transformation
         _matrix = coin.SoGetMatrixAction(ViewState().viewport)
-        _matrix.apply(_search.getPath())
+        _matrix.apply(_path)
 
         self._matrix = coin.SbMatrix(_matrix.getMatrix().getValue())
 
+        self._cache_matrix(_key, _path, self._matrix)
+
         return self._matrix
 
+    def _cache_matrix(self, key, path, matrix):
+        """
+        Cache the matrix for the path, watching the nodes which affect it
+        """
+
+        #sensors released by evictions are no longer on the call stack
+        self._released_sensors = []
+
+        while len(self._matrix_cache) >= self.matrix_cache_size:
+            self._evict_matrix(next(iter(self._matrix_cache)))
+
+        _nodes, _chain = self._get_path_dependencies(path)
+
+        self._matrix_cache[key] = SimpleNamespace(
+            matrix=matrix, chain=_chain, watched=self._watch_nodes(_nodes, key)
+        )
+
+    def _evict_matrix(self, key):
+        """
+        Drop a cached matrix, detaching the sensors no other entry uses
+        """
+
+        _entry = self._matrix_cache.pop(key, None)
+
+        if _entry is None:
+            return
+
+        for _node_key in _entry.watched:
+
+            _keys = self._matrix_dependents.get(_node_key)
+
+            if _keys is None:
+                continue
+
+            _keys.discard(key)
+
+            if _keys:
+                continue
+
+            del self._matrix_dependents[_node_key]
+
+            _sensor = self._matrix_sensors.pop(_node_key)
+            _sensor.detach()
+
+            #the sensor may be the one triggering the eviction, so it is
+            #not deleted until the next matrix is cached
+            self._released_sensors.append(_sensor)
+
+    def _is_chain_valid(self, chain):
+        """
+        Return whether or not each node of a cached path is still at the
+        same index in its parent, and each switch on the path still has
+        the same active child.  Inserting / removing a node before a path
+        child, or moving the node, invalidates the cached matrix.
+        """
+
+        for _parent, _child, _idx, _which in chain:
+
+            if _parent.findChild(_child) != _idx:
+                return False
+
+            if _which is not None and _parent.whichChild.getValue() != _which:
+                return False
+
+        return True
+
+    @staticmethod
+    def _get_active_children(group):
+        """
+        Return the children of a group which a matrix action traverses
+        """
+
+        _count = group.getNumChildren()
+        _range = range(0, _count)
+
+        if isinstance(group, coin.SoSwitch):
+
+            _which = group.whichChild.getValue()
+
+            if _which == -1:
+                return []
+
+            #-3 = all, -2 = inherited, which is treated as all
+            if 0 <= _which < _count:
+                _range = (_which,)
+
+        return [group.getChild(_i) for _i in _range]
+
+    def _get_path_dependencies(self, path):
+        """
+        Return the nodes whose changes affect the matrix of the path and
+        the (parent, child, index, whichChild) chain of the path.
+
+        The nodes are the transformations a SoGetMatrixAction accumulates
+        - those on the path and those preceding each path child, directly
+        or within groups which do not separate them - and those groups
+        and switches, whose children may change.
+        """
+
+        _nodes = []
+        _chain = []
+
+        for _i in range(0, path.getLength()):
+
+            _node = path.getNode(_i)
+
+            if isinstance(_node, coin.SoTransformation):
+                _nodes.append(_node)
+
+            if _i == 0:
+                continue
+
+            _parent = path.getNode(_i - 1)
+            _idx = path.getIndex(_i)
+            _which = None
+
+            if isinstance(_parent, coin.SoSwitch):
+                _which = _parent.whichChild.getValue()
+
+            _chain.append((_parent, _node, _idx, _which))
+
+            #a switch on the path only traverses the path child, unless
+            #all of its children are active
+            if _which is not None and _which != -3:
+                continue
+
+            _stack = [_parent.getChild(_j) for _j in range(0, _idx)]
+
+            while _stack:
+
+                _sibling = _stack.pop()
+
+                if isinstance(_sibling, coin.SoTransformation):
+                    _nodes.append(_sibling)
+
+                elif isinstance(_sibling, coin.SoGroup)\
+                    and not isinstance(_sibling, self._separators):
+
+                    _nodes.append(_sibling)
+                    _stack += self._get_active_children(_sibling)
+
+        return _nodes, tuple(_chain)
+
+    def _watch_nodes(self, nodes, key):
+        """
+        Attach a sensor to each node so the cached matrix is dropped when
+        it changes.  Returns the keys of the watched nodes.
+        """
+
+        _watched = set()
+
+        for _node in nodes:
+
+            _node_key = coin_utils.get_node_key(_node)
+
+            if _node_key not in self._matrix_sensors:
+
+                _sensor = coin.SoNodeSensor(self._matrix_sensor_cb, _node_key)
+
+                #priority zero triggers immediately, before the next
+                #lookup, and identifies the node which changed
+                _sensor.setPriority(0)
+                _sensor.attach(_node)
+
+                self._matrix_sensors[_node_key] = _sensor
+                self._matrix_dependents[_node_key] = set()
+
+            self._matrix_dependents[_node_key].add(key)
+            _watched.add(_node_key)
+
+        return _watched
+
+    def _matrix_sensor_cb(self, node_key, sensor):
+        """
+        Node sensor callback to invalidate cached matrices.  Changes below
+        a watched group are ignored - only its child list and switch state
+        matter, as any transformations within it are watched themselves.
+        """
+
+        _trigger = sensor.getTriggerNode()
+
+        if _trigger is not None\
+            and coin_utils.get_node_key(_trigger) != node_key:
+
+            return
+
+        for _key in list(self._matrix_dependents.get(node_key, ())):
+            self._evict_matrix(_key)
+
+    def invalidate_matrix_cache(self):
+        """
+        Clear all cached matrices
+        """
+
+        for _key in list(self._matrix_cache):
+            self._evict_matrix(_key)
+
     def get_active_task_panel(self, refresh=False):
         """
         Return a reference to the task panel form currently displayed
@@ -256,6 +486,29 @@ class ViewState(metaclass=Singleton):
 
         return self.view.getObjectInfo(tuple(pos))
 
+    def touch_geometry(self):
+        """
+        Mark the tracker geometry as changed
+        """
+
+        self.geometry_version += 1
+
+    def get_scene_version(self):
+        """
+        Return a value which changes whenever the camera or the tracker
+        geometry is modified.  Style changes do not change it, nor do
+        changes to the document's own scenegraph.
+        """
+
+        _camera = self.view.getCameraNode()
+        _camera_id = None
+
+        if _camera is not None:
+            _camera_id = _camera.getNodeId()
+
+        return (
+            _camera_id, self.geometry_version, EventRouter.switch_version)
+
     def getCursorPos(self):
         """
         Wrapper for InventorView getCursorPos()
@@ -298,4 +551,14 @@ class ViewState(metaclass=Singleton):
         self._matrix = None
         self.callbacks = {}
 
+        for _sensor in self._matrix_sensors.values():
+            _sensor.detach()
+
+        self._matrix_cache = OrderedDict()
+        self._matrix_sensors = {}
+        self._matrix_dependents = {}
+        self._released_sensors = []
+
+        PathIndex.clear()
+
         Singleton.finish(ViewState)
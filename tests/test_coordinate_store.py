@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Coordinate pool reuse and shrinking
+"""
+
+import numpy as np
+
+from ..trait.coordinate_store import CoordinatePool, CoordinateStore
+
+def reset_pool():
+    """
+    Empty the shared pool
+    """
+
+    CoordinatePool.data = np.zeros((0, 3))
+    CoordinatePool.used = 0
+    CoordinatePool.free = []
+
+def test_released_slices_are_reused():
+    """
+    A released slice is reused by an allocation which fits in it
+    """
+
+    reset_pool()
+
+    _a = CoordinatePool.allocate(10)
+    _b = CoordinatePool.allocate(10)
+    _c = CoordinatePool.allocate(10)
+
+    CoordinatePool.release(_b, 10)
+
+    assert CoordinatePool.free == [[_b, 10]]
+    assert CoordinatePool.allocate(4) == _b
+    assert CoordinatePool.free == [[_b + 4, 6]]
+    assert CoordinatePool.allocate(6) == _b + 4
+    assert not CoordinatePool.free
+
+    assert CoordinatePool.used == _c + 10
+    assert _a == 0
+
+def test_adjacent_releases_merge():
+    """
+    Adjacent released ranges merge into one
+    """
+
+    reset_pool()
+
+    _starts = [CoordinatePool.allocate(5) for _i in range(4)]
+
+    CoordinatePool.release(_starts[0], 5)
+    CoordinatePool.release(_starts[2], 5)
+    CoordinatePool.release(_starts[1], 5)
+
+    assert CoordinatePool.free == [[0, 15]]
+    assert CoordinatePool.allocate(15) == 0
+
+def test_released_tail_returns_to_pool():
+    """
+    Releasing the last slice returns its rows, and any free range before
+    it, to the unused end of the pool
+    """
+
+    reset_pool()
+
+    _a = CoordinatePool.allocate(5)
+    _b = CoordinatePool.allocate(5)
+
+    CoordinatePool.release(_a, 5)
+    CoordinatePool.release(_b, 5)
+
+    assert CoordinatePool.used == 0
+    assert not CoordinatePool.free
+
+def test_pool_shrinks_when_mostly_free():
+    """
+    The pool halves once less than a quarter of it is used, keeping the
+    data of the live slices
+    """
+
+    reset_pool()
+
+    _stores = [CoordinateStore(np.full((100, 3), _i)) for _i in range(10)]
+    _size = len(CoordinatePool.data)
+
+    assert _size >= 1000
+
+    del _stores[1:]
+
+    assert len(CoordinatePool.data) < _size
+    assert CoordinatePool.used == 100
+    assert _stores[0] == np.zeros((100, 3))
+
+def test_store_values_survive_pool_growth():
+    """
+    Stores keep their coordinates when the pool is reallocated to grow
+    """
+
+    reset_pool()
+
+    _a = CoordinateStore([(1.0, 2.0, 3.0), (4.0, 5.0, 6.0)])
+    _b = CoordinateStore(np.ones((500, 3)))
+
+    assert _a.tolist() == [(1.0, 2.0, 3.0), (4.0, 5.0, 6.0)]
+    assert _b.mean() == (1.0, 1.0, 1.0)
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Event routing order, visibility and handling
+"""
+
+import weakref
+
+from types import SimpleNamespace
+
+from pivy import coin
+
+from ..coin.event_router import EventRouter
+from ..coin.path_index import PathIndex
+
+class EventCallback():
+    """
+    Event callback node stand-in for dispatch, with nothing picked
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.handled = False
+
+    def getPickedPoint(self):
+        """
+        No pick under the event
+        """
+
+        return None
+
+    def isHandled(self):
+        """
+        Return the handled state
+        """
+
+        return self.handled
+
+    def setHandled(self):
+        """
+        Mark the event handled
+        """
+
+        self.handled = True
+
+class Owner():
+    """
+    Event callback owner recording its calls
+    """
+
+    def __init__(self, name, calls, handles=False):
+        """
+        Constructor
+        """
+
+        self.name = name
+        self.calls = calls
+        self.handles = handles
+
+    def on_event(self, user_data, event_cb):
+        """
+        Record the call, handling the event if required
+        """
+
+        self.calls.append(self.name)
+
+        if self.handles:
+            event_cb.setHandled()
+
+def reset_router(monkeypatch):
+    """
+    Give the router and path index empty tables under a new scene root,
+    returning the root
+    """
+
+    for _name in ('types', 'global_callbacks', 'pathed', 'local',
+        'switch_sensors'):
+
+        monkeypatch.setattr(EventRouter, _name, {})
+
+    for _name in ('subscriptions', 'nodes', 'unpathed', 'roots', 'order',
+        'visibility'):
+
+        monkeypatch.setattr(EventRouter, _name, weakref.WeakKeyDictionary())
+
+    for _name in ('cleared', 'muted_pathed', 'muted_local'):
+        monkeypatch.setattr(EventRouter, _name, weakref.WeakSet())
+
+    monkeypatch.setattr(EventRouter, 'paths', weakref.WeakValueDictionary())
+
+    for _name in ('nodes', 'parents', 'names', 'types'):
+        monkeypatch.setattr(PathIndex, _name, {})
+
+    monkeypatch.setattr(PathIndex, 'shared', set())
+
+    _root = coin.SoSeparator()
+    _root.ref()
+
+    monkeypatch.setattr(EventRouter, 'cb_node', None)
+    monkeypatch.setattr(EventRouter, 'scene_root', _root)
+
+    return _root
+
+def add_owner(owner, parent, pathed=False):
+    """
+    Insert a switched root for the owner under the parent, subscribe it
+    to location events and activate it.  Returns the root.
+    """
+
+    _root = coin.SoSwitch()
+    _root.whichChild.setValue(-3)
+
+    parent.addChild(_root)
+    PathIndex.add(_root, parent)
+
+    EventRouter.add_callback(owner, SimpleNamespace(
+        callback=owner.on_event, type=coin.SoLocation2Event.getClassTypeId(),
+        pathed=pathed))
+
+    EventRouter.set_path(owner, None, _root)
+
+    return _root
+
+def dispatch():
+    """
+    Dispatch a location event, returning the event callback
+    """
+
+    _event_cb = EventCallback()
+
+    EventRouter.dispatch('SoLocation2Event', None, _event_cb)
+
+    return _event_cb
+
+def test_owners_are_dispatched_in_activation_order(monkeypatch):
+    """
+    Pathed and local owners receive events in the order they were
+    activated
+    """
+
+    _scene = reset_router(monkeypatch)
+    _calls = []
+    _owners = [Owner(_i, _calls) for _i in range(4)]
+
+    for _i, _o in enumerate(_owners):
+        add_owner(_o, _scene, pathed=bool(_i % 2))
+
+    dispatch()
+
+    assert _calls == [0, 1, 2, 3]
+
+def test_handled_event_stops_dispatch(monkeypatch):
+    """
+    Owners after the one which handles an event do not receive it
+    """
+
+    _scene = reset_router(monkeypatch)
+    _calls = []
+
+    #the router holds owners weakly
+    _owners = [
+        Owner('a', _calls), Owner('b', _calls, handles=True),
+        Owner('c', _calls)
+    ]
+
+    for _o in _owners:
+        add_owner(_o, _scene)
+
+    assert dispatch().isHandled()
+    assert _calls == ['a', 'b']
+
+def test_hidden_owners_are_skipped(monkeypatch):
+    """
+    Owners hidden by their own switch or a switch above them receive no
+    events, and receive them again once shown
+    """
+
+    _scene = reset_router(monkeypatch)
+    _calls = []
+
+    _group = coin.SoSwitch()
+    _group.whichChild.setValue(-3)
+
+    _scene.addChild(_group)
+    PathIndex.add(_group, _scene)
+
+    _a = Owner('a', _calls)
+    _b = Owner('b', _calls)
+
+    _root = add_owner(_a, _scene)
+    add_owner(_b, _group)
+
+    dispatch()
+
+    _root.whichChild.setValue(-1)
+    dispatch()
+
+    _group.whichChild.setValue(-1)
+    dispatch()
+
+    _root.whichChild.setValue(-3)
+    _group.whichChild.setValue(-3)
+    dispatch()
+
+    assert _calls == ['a', 'b', 'b', 'a', 'b']
+    assert EventRouter.is_visible(_a) and EventRouter.is_visible(_b)
+
+def test_unindexed_roots_are_visible(monkeypatch):
+    """
+    Owners whose root is not in the path index are not treated as hidden
+    """
+
+    reset_router(monkeypatch)
+    _calls = []
+    _owner = Owner('a', _calls)
+
+    EventRouter.add_callback(_owner, SimpleNamespace(
+        callback=_owner.on_event,
+        type=coin.SoLocation2Event.getClassTypeId(), pathed=False))
+
+    EventRouter.set_path(_owner, None, coin.SoSwitch())
+
+    dispatch()
+
+    assert _calls == ['a']
+
+def test_removed_and_muted_owners_receive_nothing(monkeypatch):
+    """
+    Removed owners and owners with their callbacks switched off are not
+    dispatched
+    """
+
+    _scene = reset_router(monkeypatch)
+    _calls = []
+
+    _a = Owner('a', _calls)
+    _b = Owner('b', _calls)
+
+    add_owner(_a, _scene)
+    add_owner(_b, _scene)
+
+    EventRouter.remove(_a)
+    EventRouter.set_enabled(_b, local=False)
+
+    dispatch()
+
+    assert not _calls
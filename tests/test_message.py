@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Geometry message coalescing
+"""
+
+from ..coin.todo import todo
+from ..trait.message import Message
+from ..trait.message_types import MessageTypes as Messages
+
+class Recorder():
+    """
+    Subscriber recording the message data it receives
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.data = []
+
+    def notify_geometry(self, event, message):
+        """
+        Record a message
+        """
+
+        self.data.append(message.data)
+
+def get_sender(monkeypatch, *subscribers):
+    """
+    Return a coalescing sender with the subscribers registered.  Flushes
+    are called by the tests rather than scheduled.
+    """
+
+    monkeypatch.setattr(todo, 'delay_keyed', lambda *args, **kwargs: None)
+    monkeypatch.setattr(Message, 'coalesce_geometry', True)
+    monkeypatch.setattr(Message, 'pending_geometry', {})
+
+    _sender = Message()
+
+    for _s in subscribers:
+        _sender.register_geometry(_s)
+
+    return _sender
+
+def test_latest_message_is_delivered_once(monkeypatch):
+    """
+    Geometry messages dispatched within a tick are delivered once, with
+    the latest data
+    """
+
+    _a = Recorder()
+    _sender = get_sender(monkeypatch, _a)
+    _merged = Message.reset_geometry_merged()
+
+    _sender.dispatch_geometry(1)
+    _sender.dispatch_geometry(2)
+    _sender.dispatch_geometry(3)
+
+    assert not _a.data
+
+    Message.flush_geometry()
+
+    assert _a.data == [3]
+    assert Message.reset_geometry_merged() == 2
+
+    Message.geometry_merged = _merged
+
+def test_exclusions_are_intersected(monkeypatch):
+    """
+    A subscriber is skipped only if every merged message excluded it
+    """
+
+    _a, _b, _c = Recorder(), Recorder(), Recorder()
+    _sender = get_sender(monkeypatch, _a, _b, _c)
+
+    with _sender.exclude_subscriber(_c):
+
+        with _sender.exclude_subscriber(_a):
+            _sender.dispatch_geometry(1)
+
+        with _sender.exclude_subscriber(_b):
+            _sender.dispatch_geometry(2)
+
+    Message.flush_geometry()
+
+    assert _a.data == [2]
+    assert _b.data == [2]
+    assert not _c.data
+
+def test_finished_sender_is_not_flushed(monkeypatch):
+    """
+    Pending messages of a finished sender are dropped
+    """
+
+    _a = Recorder()
+    _sender = get_sender(monkeypatch, _a)
+
+    _sender.dispatch_geometry(1)
+    _sender.finish()
+
+    Message.flush_geometry()
+
+    assert not _a.data
+
+def test_messages_are_sent_immediately_without_coalescing(monkeypatch):
+    """
+    Without coalescing, every message is delivered when dispatched
+    """
+
+    _a = Recorder()
+    _sender = get_sender(monkeypatch, _a)
+
+    monkeypatch.setattr(Message, 'coalesce_geometry', False)
+
+    _sender.dispatch_geometry(1)
+    _sender.dispatch_geometry(2)
+
+    assert _a.data == [1, 2]
+    assert not Message.pending_geometry
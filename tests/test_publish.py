@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Publisher dispatch tables and subscriber exclusion
+"""
+
+from ..trait.publish import Publish
+
+class Recorder():
+    """
+    Subscriber recording the messages it receives
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        self.messages = []
+
+    def notify(self, event, message):
+        """
+        Record a message
+        """
+
+        self.messages.append((event, message))
+
+def test_dispatch_tables_follow_registration():
+    """
+    Dispatch tables are rebuilt when subscribers register and unregister
+    """
+
+    _pub = Publish()
+    _a, _b = Recorder(), Recorder()
+
+    _pub.register(_a, ['geometry', 'widget'])
+    _pub.register(_b, 'geometry')
+
+    assert [_s for _s, _c in _pub.get_dispatch_table('geometry')] == [_a, _b]
+    assert len(_pub.get_dispatch_table()) == 3
+
+    _pub.unregister(_a, ['geometry', 'widget'])
+
+    assert [_s for _s, _c in _pub.get_dispatch_table('geometry')] == [_b]
+    assert _pub.get_dispatch_table('widget') == ()
+    assert len(_pub.get_dispatch_table()) == 1
+
+def test_dispatch_in_registration_order():
+    """
+    Subscribers receive messages for their events in registration order
+    """
+
+    _pub = Publish()
+    _order = []
+
+    _pub.register(Recorder(), 'geometry', lambda e, m: _order.append(1))
+    _pub.register(Recorder(), 'geometry', lambda e, m: _order.append(2))
+    _pub.register(Recorder(), 'widget', lambda e, m: _order.append(3))
+
+    _pub.dispatch('message', 'geometry')
+
+    assert _order == [1, 2]
+
+def test_excluded_subscribers_are_skipped():
+    """
+    Subscribers excluded by context or by argument receive nothing, and
+    context exclusions end with the outermost context
+    """
+
+    _pub = Publish()
+    _a, _b = Recorder(), Recorder()
+
+    _pub.register(_a, 'geometry')
+    _pub.register(_b, 'geometry')
+
+    with _pub.exclude_subscriber(_a):
+
+        with _pub.exclude_subscriber(_a):
+            _pub.dispatch('first', 'geometry')
+
+        _pub.dispatch('second', 'geometry')
+
+    _pub.dispatch('third', 'geometry', excluded={_b})
+    _pub.dispatch('fourth', 'geometry')
+
+    assert [_m for _e, _m in _a.messages] == ['third', 'fourth']
+    assert [_m for _e, _m in _b.messages] == ['first', 'second', 'fourth']
+
+def test_empty_messages_are_not_sent():
+    """
+    Empty messages are not dispatched
+    """
+
+    _pub = Publish()
+    _a = Recorder()
+
+    _pub.register(_a, 'geometry')
+    _pub.dispatch(None, 'geometry')
+
+    assert not _a.messages
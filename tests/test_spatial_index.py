@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Spatial index results against brute force
+"""
+
+import numpy as np
+
+from ..coin.spatial_index import SegmentIndex, PointIndex
+
+def get_nearest(points, point):
+    """
+    Return the distance from the point to the nearest polyline segment by
+    projecting it onto every segment
+    """
+
+    _pts = np.asarray(points, dtype=np.float64)[:, :2]
+    _s = _pts[:-1]
+    _d = _pts[1:] - _pts[:-1]
+    _len_sq = (_d * _d).sum(axis=1)
+
+    _t = ((np.asarray(point[:2]) - _s) * _d).sum(axis=1)
+    _t = np.clip(_t / np.where(_len_sq > 0.0, _len_sq, 1.0), 0.0, 1.0)
+
+    return np.hypot(*(_s + _t[:, None] * _d - point[:2]).T).min()
+
+def get_walk(count, seed=0):
+    """
+    Return a random walk polyline of unit-length segments
+    """
+
+    _rng = np.random.default_rng(seed)
+    _angles = _rng.uniform(0.0, 2.0 * np.pi, count)
+
+    _steps = np.c_[np.cos(_angles), np.sin(_angles)]
+
+    return np.r_[np.zeros((1, 2)), np.cumsum(_steps, axis=0)]
+
+def test_segment_nearest_matches_brute_force():
+    """
+    Nearest segment projections match a scan of every segment
+    """
+
+    _points = get_walk(500)
+    _index = SegmentIndex(_points)
+    _rng = np.random.default_rng(1)
+
+    for _p in _rng.uniform(-40.0, 40.0, (200, 2)):
+
+        _result = _index.nearest(tuple(_p))
+
+        assert np.isclose(_result[2], get_nearest(_points, _p))
+
+def test_segment_max_distance():
+    """
+    Segments beyond the maximum distance are not returned
+    """
+
+    _index = SegmentIndex([(0.0, 0.0), (10.0, 0.0)])
+
+    assert _index.nearest((5.0, 2.0), max_distance=1.0) is None
+    assert np.isclose(_index.nearest((5.0, 2.0), max_distance=3.0)[2], 2.0)
+
+def test_segment_mixed_lengths():
+    """
+    A long tangent among many short segments covers only the cells it
+    crosses, and queries along it still match brute force
+    """
+
+    _points = np.r_[get_walk(10000, seed=2), [(50000.0, 50000.0)]]
+    _index = SegmentIndex(_points)
+
+    #the long segment's bounding box alone spans millions of cells
+    assert len(_index.grid) < 100000
+
+    _rng = np.random.default_rng(3)
+
+    _queries = np.r_[
+        _rng.uniform(-100.0, 100.0, (50, 2)),
+        _rng.uniform(0.0, 50000.0, (50, 2))
+    ]
+
+    for _p in _queries:
+
+        _result = _index.nearest(tuple(_p))
+
+        assert np.isclose(_result[2], get_nearest(_points, _p))
+
+def get_nearest_point(owners, point, max_distance, exclude=()):
+    """
+    Return the distance to the nearest point of the owners, or None
+    """
+
+    _points = [_v for _k, _v in owners.items() if _k not in exclude]
+    _points = np.concatenate(_points)[:, :2]
+
+    _dist = np.hypot(*(_points - point[:2]).T).min()
+
+    if _dist > max_distance:
+        return None
+
+    return _dist
+
+def test_point_nearest_matches_brute_force():
+    """
+    Nearest points match a scan of every point, before and after the
+    points of an owner are updated and with owners excluded
+    """
+
+    _rng = np.random.default_rng(4)
+    _owners = {_k: _rng.uniform(0.0, 100.0, (50, 3)) for _k in range(20)}
+
+    _index = PointIndex(cell_size=2.0)
+
+    for _k, _v in _owners.items():
+        _index.update(_k, _v)
+
+    _owners[3] = _rng.uniform(0.0, 100.0, (50, 3))
+    _index.pack()
+    _index.update(3, _owners[3])
+
+    for _p in _rng.uniform(0.0, 100.0, (100, 2)):
+
+        for _distance, _exclude in ((1.5, ()), (8.0, (3, 4)), (40.0, (5,))):
+
+            _result = _index.nearest(_p, _distance, _exclude)
+            _expected = get_nearest_point(_owners, _p, _distance, _exclude)
+
+            if _expected is None:
+                assert _result is None
+
+            else:
+                assert np.isclose(_result[3], _expected)
+                assert _result[1] not in _exclude
+
+def test_point_queries_do_not_repack():
+    """
+    Queries of any distance use the packed arrays as built
+    """
+
+    _rng = np.random.default_rng(5)
+    _index = PointIndex(cell_size=1.0)
+
+    _index.update('a', _rng.uniform(0.0, 100.0, (1000, 3)))
+    _index.refresh()
+
+    _packed = _index.packed
+
+    for _distance in (0.5, 10.0, 500.0):
+        _index.nearest((50.0, 50.0), _distance)
+
+    _index.update('b', _rng.uniform(0.0, 100.0, (1000, 3)))
+    _index.nearest((50.0, 50.0), 5.0)
+
+    assert _index.packed is _packed
+
+    _index.refresh(cell_size=5.0)
+
+    assert _index.packed is not _packed
+    assert not _index.dirty
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Delayed call ordering
+"""
+
+from collections import deque
+
+from ..coin.coin_enums import TaskPriority
+from ..coin.todo import todo
+
+def reset_todo(monkeypatch):
+    """
+    Give todo empty queues.  Ticks are run by the tests rather than
+    scheduled.
+    """
+
+    monkeypatch.setattr(todo, 'itinerary', deque())
+    monkeypatch.setattr(todo, 'cosmetic', deque())
+    monkeypatch.setattr(todo, 'keyed', {})
+    monkeypatch.setattr(todo, 'budget', None)
+    monkeypatch.setattr(todo, 'schedule', lambda: None)
+
+def test_ordered_calls_run_before_cosmetic_calls(monkeypatch):
+    """
+    INPUT and GEOMETRY calls run in the order queued, COSMETIC calls after
+    """
+
+    reset_todo(monkeypatch)
+
+    _calls = []
+
+    todo.delay(_calls.append, 'style', TaskPriority.COSMETIC)
+    todo.delay(_calls.append, 'insert', TaskPriority.GEOMETRY)
+    todo.delay(_calls.append, 'drag', TaskPriority.INPUT)
+    todo.delay(_calls.append, 'remove', TaskPriority.GEOMETRY)
+
+    todo.doTasks()
+
+    assert _calls == ['insert', 'drag', 'remove', 'style']
+    assert not todo.pending()
+
+def test_keyed_calls_keep_the_last_write(monkeypatch):
+    """
+    A keyed call replaces the pending call with the same callable and
+    target, and is queued at the end
+    """
+
+    reset_todo(monkeypatch)
+
+    _calls = []
+    _collapsed = todo.reset_collapsed()
+
+    todo.delay_keyed(_calls.append, 'a1', 'a')
+    todo.delay(_calls.append, 'x')
+    todo.delay_keyed(_calls.append, 'b1', 'b')
+    todo.delay_keyed(_calls.append, 'a2', 'a')
+
+    todo.doTasks()
+
+    assert _calls == ['x', 'b1', 'a2']
+    assert todo.reset_collapsed() == 1
+    assert not todo.keyed
+
+    todo.collapsed = _collapsed
+
+def test_budget_rolls_work_over_in_order(monkeypatch):
+    """
+    Work left when the budget is exceeded runs on later ticks, in order
+    """
+
+    reset_todo(monkeypatch)
+    monkeypatch.setattr(todo, 'budget', 0.0)
+
+    _calls = []
+
+    for _i in range(3):
+        todo.delay(_calls.append, _i)
+
+    todo.delay(_calls.append, 'style', TaskPriority.COSMETIC)
+
+    todo.doTasks()
+
+    assert _calls == [0]
+
+    while todo.pending():
+        todo.doTasks()
+
+    assert _calls == [0, 1, 2, 'style']
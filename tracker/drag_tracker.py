@@ -27,15 +27,22 @@ from types import SimpleNamespace
 
 from pivy import coin
 
+import numpy as np
+
 from ..support.core.singleton import Singleton
 from ..support.core.tuple_math import TupleMath
 
 from ..coin.coin_group import CoinGroup
 from ..coin.coin_enums import NodeTypes as Nodes
 from ..coin.coin_enums import Axis
+from ..coin.coin_enums import MarkerStyles
+from ..coin.coin_enums import LatencyStage
 from ..coin.coin_styles import CoinStyles as Styles
 
 from ..coin import coin_math
+from ..coin import coin_utils
+from ..coin.latency import latency
+from ..coin.spatial_index import SegmentIndex
 
 from ..trait.base import Base
 from ..trait.style import Style
@@ -50,6 +57,9 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
     Drag tracker for providing drag support to other trackers
     """
 
+    #exclude the drag line from vertex snapping
+    is_snap_target = False
+
     def __init__(self, parent):
         """
         Constructor
@@ -76,6 +86,38 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         self.drag.full.group =\
             self.drag.full.add_node(Nodes.GROUP, self.name + '_group')
 
+        #build the merged proxy for fully-dragged geometry
+        self.drag.full.proxy = CoinGroup(is_separated=True,
+            parent=self.drag.full, name=self.name + '_drag_tracker_proxy')
+
+        _proxy = self.drag.full.proxy
+
+        _proxy.draw_style = _proxy.add_node(
+            Nodes.DRAW_STYLE, self.name + '_proxy_draw_style')
+
+        _proxy.color = _proxy.add_node(
+            Nodes.COLOR, self.name + '_proxy_color')
+
+        _proxy.coordinate = _proxy.add_node(
+            Nodes.COORDINATE, self.name + '_proxy_coordinate')
+
+        _proxy.line_set = _proxy.add_node(
+            Nodes.INDEXED_LINE_SET, self.name + '_proxy_line')
+
+        _proxy.marker_set = _proxy.add_node(
+            Nodes.MARKER_SET, self.name + '_proxy_marker')
+
+        _style = Styles.SELECTED
+
+        _proxy.draw_style.lineWidth = _style.line_width
+        _proxy.draw_style.style = _style.style
+        _proxy.draw_style.linePattern = _style.line_pattern
+        _proxy.color.rgb = _style.color
+        _proxy.marker_set.markerIndex =\
+            MarkerStyles.get(_style.shape, _style.size)
+
+        _proxy.marker_set.numPoints = 0
+
         #build the partial drag group graph
         self.drag.part = CoinGroup(is_switched=True, is_separated=True,
             parent=self.drag, name=self.name + '_drag_tracker_part')
@@ -110,15 +152,23 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         self.set_pick_style(False)
 
         self.constraints = SimpleNamespace(
-            axis=None, origin=(0.0, 0.0, 0.0), points=[])
+            axis=None, origin=(0.0, 0.0, 0.0), segments=None)
 
         self.partial = SimpleNamespace(
             coordinates=[],
             transformed=[],
             drag_indices=[],
-            group_indices=[]
+            group_indices=[],
+            arrays=[],
+            vertices=[],
+            participants=[],
+            count=0,
+            rows=None
         )
 
+        #point arrays and line vertex counts of merged full-drag geometry
+        self.merged = SimpleNamespace(markers=[], lines=[])
+
         self.callbacks = SimpleNamespace(
             before_drag = SimpleNamespace(none=[], partial=[], full=[]),
             on_drag = SimpleNamespace(none=[], partial=[], full=[]),
@@ -149,6 +199,14 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         self.proj_origin = ()
         self.lock_axis = ()
 
+        #snap the drag position to the nearest indexed vertex within the
+        #tolerance in pixels, 0 = no snapping
+        self.snap_tolerance = 0
+        self.snap_exclude = set()
+
+        #(point, geometry, index, distance) of the last snapped vertex
+        self.snapped = None
+
         #------------------------
         #drag rotation attributes
         #------------------------
@@ -173,7 +231,7 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         """
 
         self.constraints.axis = None
-        self.constraints.points = []
+        self.constraints.segments = None
 
         if axis:
 
@@ -185,18 +243,42 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
 
         if points:
 
-            _prev = points[0]
+            self.constraints.segments = SegmentIndex(points)
+
+    def get_snap_distance(self):
+        """
+        Return the snap tolerance converted to world units at the cursor,
+        or None if snapping is disabled
+        """
+
+        _pos = self.mouse_state.screen_position
+
+        if not self.snap_tolerance or not _pos:
+            return None
+
+        return TupleMath._length(TupleMath.subtract(
+            self.view_state.getPoint((_pos[0] + self.snap_tolerance, _pos[1])),
+            self.view_state.getPoint(_pos)))
+
+    def get_snap_point(self, point):
+        """
+        Return the nearest vertex of indexed geometry within the snap
+        tolerance as (point, geometry, index, distance), or None
+        """
+
+        _tolerance = self.get_snap_distance()
 
-            for _p in points[1:]:
+        if not _tolerance:
+            return None
 
-                _delta = TupleMath.subtract(_p, _prev)
+        _nearest = Geometry.vertex_index.nearest(
+            point, _tolerance, self.snap_exclude)
 
-                self.constraints.points.append(
-                    SimpleNamespace(
-                        points=(_prev, _p),
-                        delta=_delta,
-                        _delta_sq=_delta[0]**2 + _delta[1]**2)
-                )
+        #the index is keyed by weak references to the geometry
+        if _nearest is None:
+            return None
+
+        return (_nearest[0], _nearest[1](), _nearest[2], _nearest[3])
 
     def get_matrix(self):
         """
@@ -244,6 +326,76 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         if cb_after:
             _cbs.after_drag.full.append(cb_after)
 
+    def insert_merged_drag(self, proxy, cb_before=None, cb_on=None,
+        cb_after=None):
+        """
+        Add geometry to the merged proxy to be fully transformed by dragging.
+        The proxy graph is built once for all geometry when dragging begins.
+
+        proxy - SimpleNamespace(points, vertices) - the world coordinates of
+            the geometry and the list of line vertex counts, None for markers
+        """
+
+        if proxy.vertices is None:
+            self.merged.markers.append(proxy.points)
+
+        else:
+            self.merged.lines.append((proxy.points, proxy.vertices))
+
+        _cbs = self.callbacks
+
+        if cb_before:
+            _cbs.before_drag.full.append(cb_before)
+
+        if cb_on:
+            _cbs.on_drag.full.append(cb_on)
+
+        if cb_after:
+            _cbs.after_drag.full.append(cb_after)
+
+    def build_merged_drag(self):
+        """
+        Pack the merged full-drag geometry into the proxy coordinate,
+        marker and indexed line set nodes
+        """
+
+        _markers = self.merged.markers
+        _lines = self.merged.lines
+
+        if not (_markers or _lines):
+            return
+
+        _points = [np.asarray(_v, dtype=np.float64).reshape(-1, 3)
+            for _v in _markers + [_w[0] for _w in _lines]]
+
+        _num_markers = sum([len(_v) for _v in _points[:len(_markers)]])
+
+        #line vertex runs follow the marker points, each terminated by -1
+        _index = []
+        _offset = _num_markers
+
+        for _pts, _vertices in _lines:
+
+            for _n in _vertices:
+
+                _index.append(np.arange(_offset, _offset + _n))
+                _index.append((-1,))
+                _offset += _n
+
+        _proxy = self.drag.full.proxy
+
+        coin_utils.set_point_array(
+            _proxy.coordinate, np.concatenate(_points), truncate=True)
+
+        _proxy.marker_set.numPoints = _num_markers
+
+        if _index:
+
+            _index = np.concatenate(_index).astype(np.int32).tolist()
+            _proxy.line_set.coordIndex.setValues(0, len(_index), _index)
+
+        _proxy.line_set.coordIndex.setNum(len(_index))
+
     def insert_partial_drag(self, coord_node, index_range, indices,
         cb_before=None, cb_on=None, cb_after=None):
 
@@ -256,52 +408,35 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         cb_before, cb_on, cb_after - custom callbacks
         """
 
-        _point = self.drag.part.coordinate.point
-        _num = self.drag.part.line.numVertices
-        _len = len(_point.getValues())
-
-        #copy the coordinates of the node group to a list
-        _pt = coord_node.point
-        _coords = [_v.getValue() for _v in _pt.getValues()]
-        _xf_coords = _coords[:]
-
-        #only one point indicates no data
-        if _len == 1:
-            _len = 0
+        #copy the coordinates of the node group to an array
+        _coords = coin_utils.get_point_array(coord_node, np.float64)
 
         #get the active view matrix from the node group
-        #first call made to clear out previous transform... bug?
-        _matrix = self.view_state.get_matrix(self.base.parent)
         _matrix = self.view_state.get_matrix(coord_node)
 
         #transform coordinates by the transformation active on the node
-        _xf_coords = self.view_state.transform_points(_xf_coords, _matrix)
+        _xf_coords = self.view_state.transform_points(_coords, _matrix)
 
-        if not _xf_coords:
+        if not len(_xf_coords):
             _xf_coords = _coords
 
-        #copy the transformed coordinates back to the original list
-        for _i in indices:
-            _coords[_i] = _xf_coords[_i]
-
-        #add new coordinates to end of the point SbMFVec3f
-        for _i, _v in enumerate(_coords):
-            _point.set1Value(_len + _i, _v)
+        #copy the transformed coordinates back to the original array
+        _coords[indices] = _xf_coords[indices]
 
         #store the coordinate that's to be transformed during dragging
+        _len = self.partial.count
         self.partial.drag_indices += [_len + _i for _i in indices]
 
-        _len = len(_num.getValues())
+        #defer the coordinate and vertex count writes to build_partial_drag()
+        self.partial.arrays.append(_coords)
+        self.partial.vertices.append(index_range[1] - index_range[0] + 1)
 
-        #-1 indicates uninitialized
-        if _num.getValues()[0] == -1:
-            _len = 0
+        #the participant's slice of the partial coordinates and the callback
+        #which receives it as the slice is transformed
+        self.partial.participants.append(
+            SimpleNamespace(start=_len, end=_len + len(_coords), callback=cb_on))
 
-        #add new vertex number to the NumVertices SbMFInt32 (by reference)
-        _num.set1Value(_len, index_range[1] - index_range[0] + 1)
-
-        self.partial.coordinates += _coords
-        self.partial.transformed.append(_coords)
+        self.partial.count += len(_coords)
 
         _cbs = self.callbacks
 
@@ -314,6 +449,34 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         if cb_after:
             _cbs.after_drag.partial.append(cb_after)
 
+    def build_partial_drag(self):
+        """
+        Write the coordinates and vertex counts of all partial-drag geometry
+        to the partial drag nodes, one bulk field update each
+        """
+
+        if not self.partial.arrays:
+            return
+
+        self.partial.coordinates = np.concatenate(self.partial.arrays)
+        self.partial.rows = np.asarray(self.partial.drag_indices, dtype=np.intp)
+        self.partial.transformed = [
+            self.partial.coordinates[_v.start:_v.end]\
+                for _v in self.partial.participants
+        ]
+
+        coin_utils.set_point_array(
+            self.drag.part.coordinate, self.partial.coordinates, truncate=True)
+
+        _num = self.drag.part.line.numVertices
+        _vertices = self.partial.vertices
+
+        _num.setValues(0, len(_vertices), _vertices)
+        _num.setNum(len(_vertices))
+
+        self.partial.arrays = []
+        self.partial.vertices = []
+
     def set_drag_axis(self, axis):
         """
         Set the lock axis, ensuring it's unit length.
@@ -329,10 +492,15 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         Initialize dragging operation
         """
 
-        if self.partial.drag_indices:
+        self.build_partial_drag()
+        self.build_merged_drag()
+
+        #size the vertex grid to the snap tolerance and pack the updated
+        #points now, so snapping queries never rebuild it mid-drag
+        _tolerance = self.get_snap_distance()
 
-            self.partial.coordinates = [_v.getValue()\
-                for _v in self.drag.part.coordinate.point.getValues()]
+        if _tolerance:
+            Geometry.vertex_index.refresh(_tolerance)
 
         self.update([self.drag_center, self.drag_center])
 
@@ -351,7 +519,6 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         _coords = [self.drag_center, self.mouse_state.world_position]
         _drag_coords = _coords[1]
         _p_origin = self.constraints.origin
-        _prev = None
 
         #project to the constraining axis
         if self.constraints.axis:
@@ -375,21 +542,23 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
 
             #_drag_coords = TupleMath.add(_coords[0], _delta)
 
-        _proj = []
+        #project drag point to the nearest constraint segment, if applicable.
+        if self.constraints.segments:
+
+            _nearest = self.constraints.segments.nearest(_coords[1])
 
-        #project drag point to constraint geometry, if applicable.
-        if self.constraints.points:
+            if _nearest:
+                _drag_coords = _nearest[0]
 
-            for _p in self.constraints.points:
+        self.snapped = None
 
-                _proj = \
-                    (_coords[1][0]-_p.points[0]) * _p.delta[0] + (_coords[1][1]-_p.points[1]) * _p.delta[1] / _p._delta_sq
+        #snap to the nearest vertex of other geometry, if applicable.
+        if self.snap_tolerance:
 
-                _dist = TupleMath.manhattan(_coords[1], _proj)
+            self.snapped = self.get_snap_point(_drag_coords)
 
-                if _prev is None or _dist < _prev:
-                    _drag_coords = _proj
-                    _prev=_dist
+            if self.snapped:
+                _drag_coords = self.snapped[0]
 
         #update the transform
         if self.mouse_state.alt_down:
@@ -433,18 +602,32 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
 
         self.drag_matrix = None
 
-        self.drag.none.group.removeAllChildren()
-        self.drag.full.group.removeAllChildren()
+        coin_utils.remove_all_children(self.drag.none.group)
+        coin_utils.remove_all_children(self.drag.full.group)
         self.drag.part.coordinate.point.setValue((0.0, 0.0, 0.0))
         self.drag.part.line.numVertices.setValue(-1)
 
+        self.drag.full.proxy.coordinate.point.setValue((0.0, 0.0, 0.0))
+        self.drag.full.proxy.line_set.coordIndex.setNum(0)
+        self.drag.full.proxy.marker_set.numPoints = 0
+
+        self.merged.markers = []
+        self.merged.lines = []
+
         self.partial.drag_indices = []
         self.partial.transformed = []
         self.partial.coordinates = []
+        self.partial.arrays = []
+        self.partial.vertices = []
+        self.partial.participants = []
+        self.partial.count = 0
+        self.partial.rows = None
         self.full_drag_nodes = []
         self.proj_origin = ()
         self.constraints.axis = None
-        self.constraints.points = []
+        self.constraints.segments = None
+        self.snap_exclude = set()
+        self.snapped = None
         self.is_rotating = False
 
         _cbs = self.callbacks
@@ -575,30 +758,36 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         Transform partially-selected geometry
         """
 
-        #iterate partial drag geometry and update
-        #zero index is part.coordinate.point index
-        _selected = [
-            self.partial.coordinates[_v] for _v in self.partial.drag_indices]
+        if self.partial.rows is None or not len(self.partial.rows):
+            return
+
+        if latency.enabled:
+            _t = latency.now()
 
         _matrix = self.view_state.get_matrix(
             self.drag.full.group, self.drag.full.top)
 
-        _selected = self.view_state.transform_points(_selected, matrix=_matrix)
-        _p = self.partial.coordinates[:]
+        #transform the dragged points of all partial geometry at once
+        _p = self.partial.coordinates.copy()
+        _rows = self.partial.rows
+
+        _p[_rows] = self.view_state.transform_points(_p[_rows], _matrix)
 
-        for _i, _j in enumerate(self.partial.drag_indices):
-            _p[_j] = _selected[_i]
-            self.callbacks.on_drag.partial[_i](_selected[_i])
+        coin_utils.set_point_array(self.drag.part.coordinate, _p)
+
+        #pass each participant its slice of the transformed points
+        self.partial.transformed = []
 
-        self.drag.part.coordinate.point.setValues(0, len(_p), _p)
+        for _v in self.partial.participants:
 
-        _offset = 0
+            _points = _p[_v.start:_v.end]
+            self.partial.transformed.append(_points)
 
-        for _i, _j in enumerate(self.partial.drag_indices):
+            if _v.callback:
+                _v.callback(_points)
 
-            _k = _j - _offset
-            self.partial.transformed[_i][_k] = _selected[_i]
-            _offset += len(self.partial.transformed[_i])
+        if latency.enabled:
+            latency.record(LatencyStage.PARTIAL, _t)
 
     def finish(self):
         """
@@ -612,6 +801,7 @@ class DragTracker(Base, Style, Event, Pick, Geometry, metaclass=Singleton):
         Geometry.finish(self)
 
         self.drag.part.finalize()
+        self.drag.full.proxy.finalize()
         self.drag.full.finalize()
         self.drag.finalize()
 
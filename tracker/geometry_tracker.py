@@ -163,7 +163,8 @@ class GeometryTracker(
 
         #add to drag list if not previously added
         if not self in Drag.drag_list and self.is_draggable:
-            self.drag_copy = self.geometry.copy()
+
+            self._has_setup = True
             Drag.drag_list.append(self)
 
         _indices = []
@@ -204,7 +205,7 @@ class GeometryTracker(
         Set up node events for the passed node
         """
 
-        #events are added to the last-added event callback node
+        #events are routed to the tracker by picks of the path node
         self.add_select_events()
         self.add_drag_events()
         self.add_keyboard_events()
@@ -213,7 +214,7 @@ class GeometryTracker(
 
             assert(node is not None), """pivy_trackers::GeometryTracker.add_node_events() - Node is NoneType.  Cannot apply event path"""
 
-            self.pathed_cb_nodes[-1].path_node = node
+            self.path_node = node
 
     def reset(self):
         """
@@ -23,6 +23,8 @@
 Line tracker class for tracker objects
 """
 
+from types import SimpleNamespace
+
 from ..support.core.tuple_math import TupleMath
 
 from ..coin.coin_enums import NodeTypes as Nodes
@@ -116,6 +118,19 @@ class LineTracker(GeometryTracker, Text, Keyboard):
 
         _m.geometry.coordinate = None
 
+    def get_drag_proxy(self):
+        """
+        Override of Drag method
+        """
+
+        _vertices = self.groups
+
+        if not _vertices:
+            _vertices = [len(self.coordinates)]
+
+        return SimpleNamespace(
+            points=self.get_drag_points(), vertices=list(_vertices))
+
     def get_drag_nodes(self):
         """
         Internal function for use with todo.delay()
@@ -232,9 +247,7 @@ class LineTracker(GeometryTracker, Text, Keyboard):
 
         if self.text and self.text.is_visible():
 
-            self.text.set_translation(
-                TupleMath.mean(self.coordinates)
-            )
+            self.text.set_translation(self.get_coordinate_mean())
 
         if self.update_cb:
             self.update_cb()
@@ -244,7 +257,7 @@ class LineTracker(GeometryTracker, Text, Keyboard):
             self.line.numVertices.setValues(0, len(groups), groups)
 
         if self.coordinates:
-            self.center = TupleMath.mean(self.coordinates)
+            self.center = self.get_coordinate_mean()
 
         for _i, _m in enumerate(self.markers):
 
@@ -320,7 +333,7 @@ class LineTracker(GeometryTracker, Text, Keyboard):
         #average the coordinates to calculate the centerpoint
         if self.drag_style == self.DragStyle.AVERAGE:
 
-            _pt = TupleMath.mean(self.coordinates)
+            _pt = self.get_coordinate_mean()
 
         #use Manhattan distance to find nearest endpoint
         elif self.drag_style == self.DragStyle.ENDPOINT:
@@ -366,11 +379,9 @@ class LineTracker(GeometryTracker, Text, Keyboard):
 
         self.coordinates = _coordinates
 
-        #Add sender to the excluded subscribers list, call update and
-        #dispatch messages, then remove the sender
-        self.excluded_subscribers.append(message.sender)
-        self.update(coordinates=self.coordinates, notify='3')
-        del self.excluded_subscribers[-1]
+        #exclude the sender from the messages dispatched by the update
+        with self.exclude_subscriber(message.sender):
+            self.update(coordinates=self.coordinates, notify='3')
 
     def notify_widget(self, event, message):
         """
@@ -23,6 +23,8 @@
 Marker tracker class for tracker objects
 """
 
+from types import SimpleNamespace
+
 from ..coin.coin_enums import NodeTypes as Nodes
 from ..coin.coin_enums import MarkerStyles
 
@@ -75,6 +77,13 @@ class MarkerTracker(GeometryTracker):
 
         super().update(coordinates=_c, matrix=matrix, notify=notify)
 
+    def get_drag_proxy(self):
+        """
+        Override of Drag method
+        """
+
+        return SimpleNamespace(points=self.get_drag_points(), vertices=None)
+
     def set_style(self, style=None, draw=None, color=None):
         """
         Override style implementation
@@ -112,12 +121,9 @@ class MarkerTracker(GeometryTracker):
         if _point == self.point:
             return
 
-        #Add sender to the excluded subscribers list, call update and
-        #dispatch messages, then remove the sender
-        self.excluded_subscribers.append(message.sender)
-
-        self.update(coordinates=_point)
-        del self.excluded_subscribers[-1]
+        #exclude the sender from the messages dispatched by the update
+        with self.exclude_subscriber(message.sender):
+            self.update(coordinates=_point)
 
     def notify_widget(self, event, message):
         """
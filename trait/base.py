@@ -25,6 +25,7 @@ Base class for Tracker objects
 
 from ..coin.coin_enums import NodeTypes as Nodes
 from ..coin.coin_group import CoinGroup
+from ..coin.path_index import PathIndex, get_node_key
 
 from ..coin.todo import todo
 
@@ -163,7 +164,11 @@ class Base():
         """
 
         Base.view_state.root.addChild(self.base.root)
-        Event.set_paths()
+        PathIndex.add(self.base.root, Base.view_state.root)
+        Base.view_state.touch_geometry()
+
+        #only trackers under the inserted root are pathed
+        Event.queue_paths(self.base.root)
 
         #assign scenegraph root as parent after insertion, rather than
         #when creating the top-level tracker's base coin group.
@@ -191,6 +196,9 @@ class Base():
         """Wrapper"""
         self.base.set_visibility(visible)
 
+        if Base.view_state:
+            Base.view_state.touch_geometry()
+
     def is_visible(self):
         """Wrapper"""
         return self.base.is_visible()
@@ -216,6 +224,8 @@ class Base():
         #    Base.mouse_state.finish()
         #    Base.mouse_state = None
 
+        Event.inserted_roots.discard(get_node_key(self.base.root))
+
         self.base.finalize()
         todo.delay(self.sg_root.removeChild, self.root)
 
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#***********************************************************************
+#* Copyright (c) 2019 Joel Graff <monograff76@gmail.com>               *
+#*                                                                     *
+#* This program is free software; you can redistribute it and/or modify*
+#* it under the terms of the GNU Lesser General Public License (LGPL)  *
+#* as published by the Free Software Foundation; either version 2 of   *
+#* the License, or (at your option) any later version.                 *
+#* for detail see the LICENCE text file.                               *
+#*                                                                     *
+#* This program is distributed in the hope that it will be useful,     *
+#* but WITHOUT ANY WARRANTY; without even the implied warranty of      *
+#* MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the       *
+#* GNU Library General Public License for more details.                *
+#*                                                                     *
+#* You should have received a copy of the GNU Library General Public   *
+#* License along with this program; if not, write to the Free Software *
+#* Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307*
+#* USA                                                                 *
+#*                                                                     *
+#***********************************************************************
+"""
+Compact, array-backed coordinate storage for Geometry trackers
+"""
+
+from bisect import bisect_left
+from collections.abc import Sequence
+
+import numpy as np
+
+class CoordinatePool():
+    """
+    Shared (N,3) float64 pool from which coordinate slices are allocated
+    """
+
+    data = np.zeros((0, 3))
+    used = 0
+
+    #sorted, non-adjacent [start, count] ranges of released rows
+    free = []
+
+    @staticmethod
+    def allocate(count):
+        """
+        Return the start of a slice of the pool of the requested length,
+        reusing the first released range large enough to hold it
+        """
+
+        for _i, _r in enumerate(CoordinatePool.free):
+
+            if _r[1] < count:
+                continue
+
+            _start = _r[0]
+
+            if _r[1] == count:
+                del CoordinatePool.free[_i]
+
+            else:
+                _r[0] += count
+                _r[1] -= count
+
+            return _start
+
+        _start = CoordinatePool.used
+        _end = _start + count
+
+        if _end > len(CoordinatePool.data):
+
+            _data = np.zeros((max(_end, 2 * len(CoordinatePool.data), 64), 3))
+            _data[:_start] = CoordinatePool.data[:_start]
+
+            CoordinatePool.data = _data
+
+        CoordinatePool.used = _end
+
+        return _start
+
+    @staticmethod
+    def release(start, count):
+        """
+        Return a slice to the pool for reuse, merging it with adjacent
+        released ranges and shrinking the pool when its tail is free
+        """
+
+        if not count:
+            return
+
+        _free = CoordinatePool.free
+        _i = bisect_left(_free, [start, count])
+
+        #merge with the following range
+        if _i < len(_free) and _free[_i][0] == start + count:
+            count += _free[_i][1]
+            del _free[_i]
+
+        #merge with the preceding range
+        if _i > 0 and sum(_free[_i - 1]) == start:
+            _i -= 1
+            start = _free[_i][0]
+            count += _free[_i][1]
+            del _free[_i]
+
+        #released rows at the end of the pool are returned to it
+        if start + count == CoordinatePool.used:
+
+            CoordinatePool.used = start
+            CoordinatePool.shrink()
+            return
+
+        _free.insert(_i, [start, count])
+
+    @staticmethod
+    def shrink():
+        """
+        Reallocate the pool to half its size when it is less than a
+        quarter used
+        """
+
+        _size = len(CoordinatePool.data)
+
+        if _size <= 64 or CoordinatePool.used > _size // 4:
+            return
+
+        _data = np.zeros((max(_size // 2, 64), 3))
+        _data[:CoordinatePool.used] = CoordinatePool.data[:CoordinatePool.used]
+
+        CoordinatePool.data = _data
+
+class CoordinateStore(Sequence):
+    """
+    Read-only sequence of 3D coordinates stored in a slice of the shared
+    coordinate pool.  Items are returned as tuples, so the store can be
+    used in place of a list of tuples.
+    """
+
+    __slots__ = ('start', 'count')
+
+    def __init__(self, points=()):
+        """
+        Constructor
+        """
+
+        #set before conversion, which may raise, so __del__ is safe
+        self.start = 0
+        self.count = 0
+
+        if isinstance(points, CoordinateStore):
+            points = points.array
+
+        _points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        self.count = len(_points)
+
+        if self.count:
+            self.start = CoordinatePool.allocate(self.count)
+            self.array[:] = _points
+
+    @property
+    def array(self):
+        """
+        The (N,3) view of the store's slice of the pool
+        """
+
+        return CoordinatePool.data[self.start:self.start + self.count]
+
+    def __len__(self):
+
+        return self.count
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return [tuple(_v) for _v in self.array[index].tolist()]
+
+        return tuple(self.array[index].tolist())
+
+    def __iter__(self):
+
+        return iter([tuple(_v) for _v in self.array.tolist()])
+
+    def __eq__(self, other):
+
+        if isinstance(other, CoordinateStore):
+            other = other.array
+
+        try:
+            _other = np.asarray(other, dtype=np.float64)
+
+        except (TypeError, ValueError):
+            return False
+
+        if _other.shape != (self.count, 3):
+            return False
+
+        return bool(np.array_equal(self.array, _other))
+
+    def __ne__(self, other):
+
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __del__(self):
+
+        CoordinatePool.release(self.start, self.count)
+
+    def __repr__(self):
+
+        return 'CoordinateStore(' + str(self.tolist()) + ')'
+
+    def tolist(self):
+        """
+        Return the coordinates as a list of tuples
+        """
+
+        return self[:]
+
+    def delta(self, points):
+        """
+        Return the (N,3) array of differences between the points and the
+        stored coordinates, or None if the counts differ
+        """
+
+        if isinstance(points, CoordinateStore):
+            points = points.array
+
+        _points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        if len(_points) != self.count:
+            return None
+
+        return _points - self.array
+
+    def mean(self):
+        """
+        Return the mean of the coordinates as a tuple
+        """
+
+        if not self.count:
+            return None
+
+        return tuple(self.array.mean(axis=0).tolist())
@@ -24,12 +24,16 @@ Drag traits for Tracker objects
 """
 
 import signal, traceback
+import weakref
 
 from collections.abc import Iterable
 
 from ..coin.todo import todo
+from ..coin.latency import latency
 from ..coin import coin_utils
 from ..coin.coin_enums import NodeTypes as Nodes
+from ..coin.coin_enums import TaskPriority
+from ..coin.coin_enums import LatencyStage
 from types import SimpleNamespace
 
 from ..trait.select import Select
@@ -63,6 +67,16 @@ class Drag():
     drag_tracker = None
     drag_list = []
 
+    #pack fully-dragged geometry into a single merged drag proxy rather
+    #than copying the subgraph of each tracker
+    merge_full_drag = False
+
+    #latest drag mouse event user data by tracker, processed once per tick
+    drag_pending = weakref.WeakKeyDictionary()
+
+    #number of drag mouse events replaced by a later event before processing
+    drag_events_skipped = 0
+
     def __init__(self):
         """
         Constructor
@@ -85,6 +99,7 @@ class Drag():
         self.drag_indices = []
         self.drag_center = None
         self._is_setting_up = False
+        self._has_setup = False
 
         self.drag_mouse_cb = None
         self.drag_button_cb = None
@@ -143,6 +158,13 @@ class Drag():
 
         Drag.drag_tracker.translate_increment = increment
 
+    def set_snap_tolerance(self, tolerance = 0):
+        """
+        Set the vertex snapping tolerance in pixels - 0 = no snapping
+        """
+
+        Drag.drag_tracker.snap_tolerance = tolerance
+
     def set_rotate_increment(self, increment = 0.0):
         """
         Set the increment of rotation in radians - 0.0 = free rotation
@@ -204,7 +226,51 @@ class Drag():
         if user_data is None:
             user_data = 'NONE'
 
-        todo.delay(self.on_drag, user_data)
+        if self in Drag.drag_pending:
+            Drag.drag_events_skipped += 1
+
+        Drag.drag_pending[self] = user_data
+
+        todo.delay_keyed(
+            Drag.process_drag_events, None, Drag, TaskPriority.INPUT)
+
+    @staticmethod
+    def process_drag_events():
+        """
+        Process the latest drag mouse event, updating the drag tracker once
+        for all dragging trackers
+        """
+
+        _pending = Drag.drag_pending
+        Drag.drag_pending = weakref.WeakKeyDictionary()
+
+        _trackers = [_k for _k in _pending if _k.is_dragging]
+
+        if not _trackers or not Drag.drag_tracker:
+            return
+
+        if latency.enabled:
+
+            _t = latency.now()
+            Drag.drag_tracker.update_drag()
+            latency.record(LatencyStage.DRAG, _t)
+
+        else:
+            Drag.drag_tracker.update_drag()
+
+        for _k in _trackers:
+            _k.on_drag(_pending[_k])
+
+    @staticmethod
+    def reset_drag_events_skipped():
+        """
+        Reset the skipped drag event counter, returning the previous count
+        """
+
+        _count = Drag.drag_events_skipped
+        Drag.drag_events_skipped = 0
+
+        return _count
 
     def drag_button_event(self, user_data, event_cb):
         """
@@ -229,9 +295,9 @@ class Drag():
             self.set_event_path(self.drag_button_cb, True)
             self.is_dragging = False
 
-            todo.delay(self.after_drag, self)
-            todo.delay(self.teardown_drag, None)
-            todo.delay(self.drag_tracker.end_drag, None)
+            todo.delay(self.after_drag, self, TaskPriority.INPUT)
+            todo.delay(self.teardown_drag, None, TaskPriority.INPUT)
+            todo.delay(self.drag_tracker.end_drag, None, TaskPriority.INPUT)
 
         #start of drag operations
         else:
@@ -244,8 +310,8 @@ class Drag():
             if user_data is None:
                 user_data = 'NONE'
 
-            todo.delay(self.before_drag, user_data)
-            todo.delay(self.drag_tracker.begin_drag, None)
+            todo.delay(self.before_drag, user_data, TaskPriority.INPUT)
+            todo.delay(self.drag_tracker.begin_drag, None, TaskPriority.INPUT)
 
     def get_drag_nodes(self):
         """
@@ -254,6 +320,44 @@ class Drag():
 
         return []
 
+    def get_drag_proxy(self):
+        """
+        Return the geometry of the tracker for the merged drag proxy as
+        SimpleNamespace(points, vertices), or None if not supported.
+        Base implementation for overriding in inherited classes
+
+        points - the coordinates transformed to world space
+        vertices - list of line vertex counts, None for markers
+        """
+
+        return None
+
+    def get_drag_points(self):
+        """
+        Return the coordinates transformed by the transformation
+        active on the coordinate node
+        """
+
+        _matrix = self.view_state.get_matrix(self.geometry.coordinate)
+
+        return self.view_state.transform_points(
+            self.get_coordinate_buffer(), _matrix)
+
+    def get_drag_copy(self):
+        """
+        Return the drag proxy geometry if merging full drags,
+        otherwise a copy of the geometry subgraph
+        """
+
+        if Drag.merge_full_drag:
+
+            _proxy = self.get_drag_proxy()
+
+            if _proxy:
+                return _proxy
+
+        return self.geometry.copy()
+
     def before_drag(self, user_data):
         """
         Called before drag operations begin
@@ -265,11 +369,13 @@ class Drag():
         for _cb in self.before_drag_callbacks:
             _cb(_ud)
 
-        self.drag_copy = self.geometry.copy()
-
         #enabling sinks mouse events at the drag tracker
         Drag.drag_tracker.drag_center = self.drag_center
 
+        #dragged geometry cannot snap to itself
+        Drag.drag_tracker.snap_exclude = set(
+            [_v.index_ref for _v in Drag.drag_list])
+
         for _v in Drag.drag_list:
 
             #remove duplicates
@@ -278,13 +384,20 @@ class Drag():
             #if all the coordinate indices are added, switch to full drag
             _v.is_full_drag = len(_v.drag_indices) == len(_v.coordinates)
 
-            #refresh the drag copy for latest changes
-            _v.drag_copy = _v.geometry.copy()
-
             if _v.is_full_drag:
 
-                Drag.drag_tracker.insert_full_drag(
-                    _v.drag_copy, cb_on=_v.on_full_drag)
+                #the drag copy is built once, only for full drags
+                _v.drag_copy = _v.get_drag_copy()
+
+                if isinstance(_v.drag_copy, SimpleNamespace):
+
+                    Drag.drag_tracker.insert_merged_drag(
+                        _v.drag_copy, cb_on=_v.on_full_drag)
+
+                else:
+
+                    Drag.drag_tracker.insert_full_drag(
+                        _v.drag_copy, cb_on=_v.on_full_drag)
 
                 continue
 
@@ -316,46 +429,22 @@ class Drag():
 
     def _apply_search(self, node, node_type):
         """
-        Perform a search for a node, returning a list of found nodes
+        Perform a search for a node, returning the first found node
         """
 
-        from pivy import coin
-        from ..coin.coin_enums import NodeTypes as Nodes, NodeSearch
-
-        interest = NodeSearch.FIRST
-
-        #define the search path
-        _search = coin.SoSearchAction()
-        _search.setType(node_type)
-        _search.setInterest(interest)
-        _search.apply(node)
-
-        if interest == NodeSearch.ALL:
-
-            _paths = _search.getPaths()
-
-            if not _paths:
-                return None
-
-            _paths = [_paths.get(_i) for _i in range(0, _paths.getLength())]
-
-            return [_p.getTail() for _p in _paths]
-
-        _path = _search.getPath()
-
-        if not _path:
-            return None
-
-
-        return _path.getTail()
+        return coin_utils.find_child_by_type(node_type, node)
 
     def on_partial_drag(self, user_data):
         """
         Callback stub for partial drag  operations in the drag tracker
+
+        user_data - (N,3) array of this tracker's partial drag coordinates
+            with the dragged points transformed, passed once per update.
+            Callbacks receive it as SimpleNamespace(name, points).
         """
 
         for _cb in  self.on_partial_drag_callbacks:
-            _cb(SimpleNamespace(name=self.name, matrix=user_data))
+            _cb(SimpleNamespace(name=self.name, points=user_data))
 
     def on_full_drag(self, user_data):
         """
@@ -373,15 +462,13 @@ class Drag():
         if not self.is_dragging:
             return
 
-        self.drag_tracker.update_drag()
-
         _ud = SimpleNamespace(
             user_data=user_data,
             obj=self,
             matrix=Drag.drag_tracker.get_matrix())
 
         for _cb in self.on_drag_callbacks:
-            todo.delay(_cb, _ud)
+            todo.delay(_cb, _ud, TaskPriority.INPUT)
 
     def after_drag(self, user_data):
         """
@@ -398,8 +485,8 @@ class Drag():
         Called after end of drag operations
         """
 
-        #abort if no drag copy to prevent recursion
-        if not self.drag_copy:
+        #abort if not set up to prevent recursion
+        if not self._has_setup:
             return
 
         Drag.drag_list = []
@@ -426,3 +513,4 @@ class Drag():
 
         Drag.drag_tracker.finish()
         Drag.drag_tracker = None
+        Drag.drag_pending = weakref.WeakKeyDictionary()
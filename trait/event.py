@@ -23,15 +23,17 @@
 Event class for Tracker objects
 """
 import weakref
+
+from functools import partial
 from types import SimpleNamespace
 
 from ..support.core.tuple_math import TupleMath
 
-from ..coin.coin_group import CoinGroup
-from ..coin.coin_enums import NodeTypes as Nodes
 from ..coin.coin_enums import InputEvent as InputEvent
-from ..coin.coin_enums import Keys
-from ..coin import coin_utils
+from ..coin.coin_enums import LatencyStage
+from ..coin.event_router import EventRouter
+from ..coin.latency import latency
+from ..coin.path_index import PathIndex, get_node_key
 from ..coin.todo import todo
 
 class Event():
@@ -43,12 +45,21 @@ class Event():
     base = None
     view_state = None
     mouse_state = None
+    path_node = None
     name = ''
 
     #class statics
-    _self_weak_list = {}
     global_cb_node = None
 
+    #live trackers, pruned as they are collected, and the number collected
+    trackers = weakref.WeakSet()
+    collected = 0
+
+    #trackers awaiting event paths, and keys of the roots inserted into
+    #the scenegraph
+    pending_paths = weakref.WeakKeyDictionary()
+    inserted_roots = set()
+
     @staticmethod
     def set_paths():
         """
@@ -56,28 +67,75 @@ class Event():
         scene insertion.
         """
 
-        for _v in Event._self_weak_list.values():
-            _v().set_event_paths()
+        for _v in list(Event.trackers):
+            _v.set_event_paths()
+
+    @staticmethod
+    def on_collected():
+        """
+        Finalizer callback counting collected trackers
+        """
 
-    is_switched = None
-    is_separated = None
-    switch_first = None
+        Event.collected += 1
 
     @staticmethod
-    def init_graph(is_switched=True, is_separated=False, switch_first=True):
-        Event.is_switched = is_switched
-        Event.is_separated = is_separated
-        Event.switch_first = switch_first
+    def get_tracker_counts():
+        """
+        Return the number of live trackers, in total and by class name,
+        and the number collected
+        """
+
+        _types = {}
+
+        for _v in list(Event.trackers):
+
+            _name = type(_v).__name__
+            _types[_name] = _types.get(_name, 0) + 1
+
+        return SimpleNamespace(
+            live=len(Event.trackers),
+            types=_types,
+            collected=Event.collected
+        )
+
+    @staticmethod
+    def queue_paths(root=None):
+        """
+        Schedule path assignment for pending trackers after the root has
+        been inserted.  Insertions are batched into one pass per todo tick.
+        """
+
+        if root is not None:
+            Event.inserted_roots.add(get_node_key(root))
+
+        todo.delay_keyed(Event.update_paths, None, Event)
 
     @staticmethod
-    def callback_container(node=None, callback=None, event_type=None):
+    def update_paths():
+        """
+        Set paths on the pending trackers whose subgraph lies under an
+        inserted root.  Trackers not yet inserted remain pending.
+        """
+
+        for _v in list(Event.pending_paths.keys()):
+
+            if not PathIndex.is_under(_v.base.root, Event.inserted_roots):
+                continue
+
+            del Event.pending_paths[_v]
+            _v.set_event_paths()
+
+    @staticmethod
+    def callback_container(
+        node=None, callback=None, event_type=None, pathed=True):
         """
         Create a callback container for event callbacks
         """
 
         return SimpleNamespace(
             callback=callback,
-            type=event_type
+            type=event_type,
+            pathed=pathed
         )
 
     def __init__(self):
@@ -85,144 +143,114 @@ class Event():
         Constructor
         """
 
-        self.event = CoinGroup(
-            switch_first=Event.switch_first,
-            is_separated=Event.is_separated,
-            is_switched=Event.is_switched,
-            parent=self.base, name=self.name + '_EVENTS')
-
-        self.pathed_switch = self.event.add_node(Nodes.SWITCH, 'PATH_SWITCH')
-        self.local_switch = self.event.add_node(Nodes.SWITCH, 'LOCAL_SWITCH')
-
-        self.pathed_cb_nodes = [SimpleNamespace(
-                cb_node=coin_utils.add_child(
-                    Nodes.EVENT_CB,
-                    self.pathed_switch,
-                    self.name + '_PATHED_CB_NODE'),
-                path_node=None,
-                callbacks=[]
-            )]
-
-        self.local_cb_node = coin_utils.add_child(
-            Nodes.EVENT_CB, self.local_switch, 'LOCAL_CB_NODE')
+        #callbacks are routed to the tracker by the single router node
+        #rather than by per-tracker event callback nodes
+        self.event = SimpleNamespace(pathed=False, local=False)
 
         self.handle_events = False
 
-        #create a global callback for managing mouse updates
+        #create the router node and the global callbacks for managing
+        #mouse updates
         if not Event.global_cb_node:
 
-            self.add_mouse_event(self._event_mouse_event)
-            self.add_button_event(self._event_button_event)
+            Event.global_cb_node = EventRouter.attach(self.view_state.root)
 
-            Event.global_cb_node =\
-                self.event.add_node(Nodes.EVENT_CB, 'GLOBAL_EVENT_CALLBACK')
+            #bound to the shared states, not the tracker, so the router
+            #does not keep the first tracker alive
+            EventRouter.set_global_callback(
+                InputEvent.LOCATION2, partial(Event._event_mouse_event,
+                    self.mouse_state, self.view_state))
 
-        self.event.set_visibility(True)
+            EventRouter.set_global_callback(
+                InputEvent.MOUSE_BUTTON, partial(Event._event_button_event,
+                    self.mouse_state, self.view_state))
 
-        Event._self_weak_list[self] = weakref.ref(self)
-        Event.init_graph()
+        Event.trackers.add(self)
+        weakref.finalize(self, Event.on_collected)
+
+        #trackers created under an inserted parent are pathed on the next
+        #tick, others once their root is inserted
+        Event.pending_paths[self] = True
+        Event.queue_paths()
 
         self.toggle_pathed_event_callbacks()
         self.toggle_local_event_callbacks()
 
         super().__init__()
 
-    def _event_mouse_event(self, data, event_cb):
+    @staticmethod
+    def _event_mouse_event(mouse_state, view_state, data, event_cb):
         """
         Default mouse location event
         """
 
-        self.mouse_state.update(event_cb, self.view_state)
+        if latency.enabled:
 
-        if not (self.mouse_state.shift_down and \
-            self.mouse_state.button1.dragging):
+            _t = latency.start_event()
+            mouse_state.update(event_cb, view_state)
+            latency.record(LatencyStage.MOUSE, _t)
 
+        else:
+            mouse_state.update(event_cb, view_state)
+
+        if not (mouse_state.shift_down and mouse_state.button1.dragging):
             return
 
-        _vec = TupleMath.scale(self.mouse_state.vector, 0.10)
-        _pos = TupleMath.add(self.mouse_state.prev_position, _vec)
+        _vec = TupleMath.scale(mouse_state.vector, 0.10)
+        _pos = TupleMath.add(mouse_state.prev_position, _vec)
 
-        self.mouse_state.set_mouse_position(self.view_state, _pos)
+        mouse_state.set_mouse_position(view_state, _pos)
 
-    def _event_button_event(self, data, event_cb):
+    @staticmethod
+    def _event_button_event(mouse_state, view_state, data, event_cb):
         """
         Default button event
         """
 
-        self.mouse_state.update(event_cb, self.view_state)
+        mouse_state.update(event_cb, view_state)
 
     def set_event_paths(self):
         """
-        Set paths on every callback node that has a path
+        Route pathed callbacks to picks of the path node, activating the
+        tracker's callbacks in the event router
         """
 
-        for _sn in self.pathed_cb_nodes:
-
-            _sa = coin_utils.search(_sn.path_node, self.view_state.sg_root)
-            _sn.cb_node.setPath(_sa.getPath())
+        EventRouter.set_path(self, self.path_node, self.base.root)
 
     def set_event_path(self, callback, pathed=True):
         """
-        Set/clear a path on a specific callback node
+        Set/clear the path on the pathed callbacks.  Unpathed callbacks
+        receive every event regardless of the pick.
         """
 
-        _cb = self.pathed_cb_nodes[-1]
-
-        _path = None
-
-        if pathed:
-
-            for _c in self.pathed_cb_nodes:
-
-                for _d in _c.callbacks:
-
-                    if _d != callback[0]:
-                        continue
-
-                    _sa = coin_utils.search(
-                        _cb.path_node, self.view_state.sg_root)
-
-                    _path = _sa.getPath()
-
-                    break
-
-        _cb.cb_node.setPath(_path)
+        EventRouter.set_pathed(self, pathed)
 
     def add_event_callback(self, event_type, callback, pathed=True):
         """
         Add an event callback
         """
 
-        _node = self.pathed_cb_nodes[-1].cb_node
+        _cb = Event.callback_container(
+            callback=callback, event_type=event_type, pathed=pathed)
 
-        if not pathed:
-            _node = self.local_cb_node
+        EventRouter.add_callback(self, _cb)
 
-        else:
-            self.pathed_cb_nodes[-1].callbacks.append(callback)
-
-        return _node.addEventCallback(event_type, callback)
+        return _cb
 
     def remove_event_callback(
         self, event_type=None, callback=None, pathed=True):
         """
         Remove an event callback.
 
-        index - index of callback node.
         event_type - event type of callback to remove (optional).
-        callback - Callback to remove.  If None, removes all by event_type
+        callback - Callback to remove.
         """
 
         assert((callback is not None) or (event_type is not None)), """
         Event.remove_event_callback():callback and event_type are None
         """
 
-        _node = self.pathed_cb_nodes[-1].cb_node
-
-        if not pathed:
-            _node = self.local_cb_node
-
-        _node.removeEventCallback(callback)
+        EventRouter.remove_callback(self, callback, event_type)
 
     def add_keyboard_event(self, callback, pathed=False):
         """
@@ -269,39 +297,36 @@ class Event():
 
     def events_enabled(self):
         """
-        Returns whether or not event switch is on
+        Returns whether or not event callbacks are on
         """
 
-        return self.event.whichChild == 0
+        return self.event.pathed or self.event.local
 
     def toggle_pathed_event_callbacks(self):
         """
         Switch pathed events on / off
         """
 
-        coin_utils.toggle_switch(self.pathed_switch)
+        self.event.pathed = not self.event.pathed
+        EventRouter.set_enabled(self, pathed=self.event.pathed)
 
     def toggle_local_event_callbacks(self):
         """
         Switch event callbacks on / off
         """
 
-        coin_utils.toggle_switch(self.local_switch)
+        self.event.local = not self.event.local
+        EventRouter.set_enabled(self, local=self.event.local)
 
     def finish(self):
         """
         Cleanup
         """
 
-        self.event.finalize()
+        EventRouter.remove(self)
+        Event.pending_paths.pop(self, None)
+
         self.handle_events = False
-        self.local_cb_node = None
-        self.pathed_switch = None
-        self.local_switch = None
-        self.pathed_cb_nodes = []
 
-        Event._self_weak_list = {}
+        Event.trackers.discard(self)
         Event.global_cb_node = None
-
-
-Event.init_graph()
@@ -23,13 +23,24 @@
 Geometry nodes for Tracker objects
 """
 
+import weakref
+
+from collections import deque
 from collections.abc import Iterable
 
+import numpy as np
+
 from ..support.core.tuple_math import TupleMath
 
+from ..coin import coin_utils
 from ..coin.coin_group import CoinGroup
 from ..coin.coin_enums import NodeTypes as Nodes
+from ..coin.coin_enums import LatencyStage
 from ..coin.todo import todo
+from ..coin.latency import latency
+from ..coin.spatial_index import PointIndex, BoxIndex
+
+from .coordinate_store import CoordinateStore
 
 class Geometry():
     """
@@ -48,6 +59,38 @@ class Geometry():
     is_geo = None
     switch_first = None
 
+    #geometry currently being updated by Geometry.propagate()
+    propagating = set()
+
+    #store coordinates in the shared array-backed pool rather than as
+    #lists of tuples.  May be set per class or per instance.
+    compact_coordinates = False
+
+    #partial coordinate writes fall back to a full write past the
+    #fraction of changed points or number of changed ranges
+    dirty_write_ratio = 0.25
+    dirty_write_ranges = 8
+
+    #index of committed coordinates of all snap target geometry, in
+    #world space
+    vertex_index = PointIndex()
+    is_snap_target = True
+
+    #index of the world space bounding boxes of committed coordinates of
+    #all geometry
+    bounds_index = BoxIndex()
+
+    @staticmethod
+    def remove_from_indices(index_ref):
+        """
+        Remove geometry from the vertex and bounds indices by its index
+        reference.  Called on finish and by the finalizer of geometry
+        dropped without finish.
+        """
+
+        Geometry.vertex_index.remove(index_ref)
+        Geometry.bounds_index.remove(index_ref)
+
     @staticmethod
     def init_graph(
         is_switched=False, is_separated=False, switch_first=True, is_geo=False):
@@ -94,9 +137,21 @@ class Geometry():
         self.do_linked_update = True
         self.is_invalid = False
 
+        #array mirror of the coordinate node points and the node id
+        #at the time it was last read or written
+        self._coordinate_buffer = None
+        self._coordinate_buffer_id = None
+
         #flag to update the transform node instead of the coordinate node
         self.update_transform = False
 
+        #the indices key geometry by a weak reference, hashed now so it can
+        #still be removed once the geometry is collected
+        self.index_ref = weakref.ref(self)
+        hash(self.index_ref)
+
+        weakref.finalize(self, Geometry.remove_from_indices, self.index_ref)
+
         #reset the graph node parameters
         Geometry.init_graph()
 
@@ -175,89 +230,225 @@ class Geometry():
                 return
 
 
+        if self.compact_coordinates:
+            _c = CoordinateStore(_c)
+
         #compute the changes in coordinates
-        _deltas = _c
+        _changes = self.get_coordinate_changes(_c)
+
+        #no changes, either by coordinate update or matrix transformation.
+        if not _changes:
+           return
+
+        #process linked updates if responsible for any
+        if self.do_linked_update and self not in Geometry.propagating:
+
+            if self.coordinates and self in self.linked_geometry:
+
+                if latency.enabled:
+                    _t = latency.now()
+
+                self.in_update = True
+                Geometry.propagate(self, _changes)
+                self.in_update = False
+
+                if latency.enabled:
+                    latency.record(LatencyStage.LINKED, _t)
+
+        if self.compact_coordinates:
+            self.prev_coordinates = CoordinateStore(self.get_coordinate_buffer())
+
+        else:
+            self.prev_coordinates = self.get_coordinates()
+
+        self.coordinates = _c
+
+        #process updates to the current geometry
+        if not self.update_transform:
+            todo.delay_keyed(self.set_coordinates, _c)
+
+        else:
+            _t = self.geometry.get_translation()
+            self.geometry.set_translation(TupleMath.add(_t, _c[0]))
+
+            #the translation moves the indexed world points
+            self.update_indices()
+
+    def get_coordinate_changes(self, coordinates):
+        """
+        Return a dict of the indices of the passed coordinates which differ
+        from the current coordinates and their deltas
+        """
+
+        if isinstance(self.coordinates, CoordinateStore):
+
+            _deltas = self.coordinates.delta(coordinates)
+
+            if _deltas is not None:
+
+                _rows = np.flatnonzero(np.any(_deltas != 0.0, axis=1))
+
+                return {int(_i): tuple(_deltas[_i].tolist()) for _i in _rows}
+
+        if isinstance(coordinates, CoordinateStore):
+            coordinates = coordinates.tolist()
+
+        _deltas = coordinates
 
         if self.coordinates:
-            _deltas = TupleMath.subtract(_c, self.coordinates)
+            _deltas = TupleMath.subtract(coordinates, list(self.coordinates))
 
         #deltas need to be encapsulated as tuples in a tuple as it's assumed
         #a separate delta for each coordinate
         if not isinstance(_deltas[0], Iterable):
             _deltas = (_deltas,)
 
-        #no changes, either by coordinate update or matrix transformation.
-        if not _deltas or all([_v==(0.0, 0.0, 0.0) for _v in _deltas]):
-           return
+        return {
+            _i: _v for _i, _v in enumerate(_deltas) if _v != (0.0, 0.0, 0.0)
+        }
 
-        #get a list of the coordinates which differ from current
-        _indices = [_i for _i, _v in enumerate(self.coordinates)\
-            if _v and _v != (0.0, 0.0, 0.0)
-        ]
+    def get_coordinate_mean(self):
+        """
+        Return the mean of the current coordinates
+        """
 
-        if self.do_linked_update:
+        if isinstance(self.coordinates, CoordinateStore):
+            return self.coordinates.mean()
 
-            self.in_update = True
+        return TupleMath.mean(self.coordinates)
 
-            #process linked updates if responsible for any
-            if self.coordinates and self in self.linked_geometry:
+    @staticmethod
+    def propagate(source, changes):
+        """
+        Propagate coordinate changes in the source to all linked geometry
+
+        source - the geometry which has changed
+        changes - dict of the source's changed indices and their deltas
 
-                for _v in self.linked_geometry[self]:
+        Linked geometry is visited breadth-first from the source.  Each
+        target's coordinates are computed once, from the changes of every
+        already-visited geometry linked to it, and each target is updated
+        exactly once without further recursion.
+        """
+
+        _changes = {source: changes}
+        _parents = {source: None}
+        _queue = deque([source])
+        _updates = []
+
+        while _queue:
+
+            _node = _queue.popleft()
+
+            if _node is not source:
 
-                    if _v is self.linked_parent:
+                _coords = _node.coordinates
+
+                for _src in _node.linked_geometry:
+
+                    _src_changes = _changes.get(_src)
+
+                    if not _src_changes or _src is _node:
                         continue
 
-                    _v.linked_update(self, _indices, _deltas)
+                    _coords = _node.get_linked_coordinates(
+                        _src, _src_changes, _coords)
 
-            self.in_update = False
+                _node_changes = {}
 
-        self.prev_coordinates = self.get_coordinates()
-        self.coordinates = _c
+                for _i, (_v, _w) in enumerate(zip(_coords, _node.coordinates)):
 
-        #process updates to the current geometry
-        if not self.update_transform:
-            todo.delay(self.set_coordinates, _c)
+                    if _v != _w:
+                        _node_changes[_i] = TupleMath.subtract(_v, _w)
 
-        else:
-            _t = self.geometry.get_translation()
-            self.geometry.set_translation(TupleMath.add(_t, _c[0]))
+                #no change, stop propagating along this branch
+                if not _node_changes:
+                    continue
 
-    def linked_update(self, parent, indices, deltas):
+                _changes[_node] = _node_changes
+                _updates.append((_node, _coords))
+
+                if not _node.do_linked_update:
+                    continue
+
+            for _target in _node.linked_geometry.get(_node, ()):
+
+                if _target in _parents or _target.in_update:
+                    continue
+
+                if not _target.coordinates:
+                    continue
+
+                _parents[_target] = _node
+                _queue.append(_target)
+
+        _targets = set([_v[0] for _v in _updates])
+        Geometry.propagating |= _targets
+
+        for _target, _coords in _updates:
+
+            _target.linked_parent = _parents[_target]
+            _target.update(_coords, notify='1')
+            _target.linked_parent = None
+
+        Geometry.propagating -= _targets
+
+    def get_linked_coordinates(self, parent, changes, coordinates=None):
         """
-        Updates geometry linked to this object
+        Return the coordinates updated by changes in linked parent geometry
+
+        parent - the linked geometry which has changed
+        changes - dict of the parent's changed indices and their deltas
+        coordinates - coordinates to update, current coordinates by default
         """
 
-        if not parent in self.linked_geometry:
-            return
+        if coordinates is None:
+            coordinates = self.coordinates
 
-        if self.in_update:
-            return
+        _link_indices = self.linked_geometry.get(parent)
+
+        if not _link_indices:
+            return coordinates
 
-        #indices in this object which are linked to the parent
-        _link_indices = self.linked_geometry[parent]
-        _link_coords = [_v.getValue()\
-                for _v in self.geometry.coordinate.point.getValues()
-            ]
+        _coords = list(coordinates)
 
-        #iterate the changed indices, adding the corresponding parent delta
-        for _i, _v in enumerate(indices):
+        for _idx, _targets in _link_indices.items():
 
-            if _v not in _link_indices:
+            _delta = changes.get(_idx)
+
+            if _delta is None:
                 continue
 
-            #update by transform or update all coordinates
-            if any(_w == -1 for _w in _link_indices[_v]):
-                _link_coords = deltas[_v]
+            #-1 indicates the entire geometry is linked by transform, in
+            #which case the delta is passed as the coordinates, to be added
+            #to the translation by update()
+            if -1 in _targets:
+                _coords = [_delta]
+                continue
+
+            for _x in _targets:
+                _coords[_x] = TupleMath.add(_coords[_x], _delta)
+
+        return _coords
+
+    def linked_update(self, parent, indices, deltas):
+        """
+        Updates geometry linked to this object
+
+        indices - the parent's changed indices
+        deltas - the corresponding parent deltas
+        """
+
+        if not parent in self.linked_geometry:
+            return
 
-            #iterate each linked index, and update the corresponding coordinate
-            else:
+        if self.in_update:
+            return
 
-                for _x in _link_indices[_v]:
-                    _link_coords[_x] =\
-                        TupleMath.add(deltas[_i], _link_coords[_x])
+        _coords = self.get_linked_coordinates(parent, dict(zip(indices, deltas)))
 
         self.linked_parent = parent
-        self.update(_link_coords, notify = "1")
+        self.update(_coords, notify = "1")
         self.linked_parent = None
 
     def transform_points(self, points=None):
@@ -279,29 +470,147 @@ class Geometry():
     def set_coordinates(self, coordinates):
         """
         Update the SoCoordinate3 with the passed coordinates
-        Assumes coordinates is a list of 3-float tuples
+        Assumes coordinates is a list of 3-float tuples or an (N,3) array
         """
 
-        self.geometry.coordinate.point.setValues(
-            0, len(coordinates), coordinates)
+        if not latency.enabled:
+            self.set_coordinate_buffer(coordinates)
+            return
+
+        _t = latency.now()
+        self.set_coordinate_buffer(coordinates)
+        latency.record(LatencyStage.COMMIT, _t)
 
     def get_coordinates(self, _dtype=tuple):
         """
         Return the coordinates as the specified iterable type
         """
 
-        return [
-            _dtype(_v.getValue()) \
-                for _v in self.geometry.coordinate.point.getValues()
-        ]
+        return [_dtype(_v) for _v in self.get_coordinate_buffer().tolist()]
+
+    def get_coordinate_buffer(self):
+        """
+        Return the coordinate node points as a read-only, contiguous
+        (N,3) array (float32, float64 for geo coordinates).  The node is
+        only re-read if it has been modified since the buffer was last
+        read or written.
+        """
+
+        _node = self.geometry.coordinate
+        _id = _node.getNodeId()
+
+        if self._coordinate_buffer is None\
+            or _id != self._coordinate_buffer_id:
+
+            self._coordinate_buffer = coin_utils.get_point_array(_node)
+            self._coordinate_buffer.flags.writeable = False
+            self._coordinate_buffer_id = _id
+
+        return self._coordinate_buffer
+
+    def set_coordinate_buffer(self, points):
+        """
+        Write the points to the coordinate node and keep them as the
+        current coordinate buffer.  If the node is unchanged since the
+        buffer was last read or written, only the ranges of points which
+        differ are written.
+        """
+
+        _node = self.geometry.coordinate
+
+        if isinstance(points, CoordinateStore):
+            points = points.array
+
+        _buffer = np.array(
+            points, dtype=coin_utils.get_point_dtype(_node)).reshape(-1, 3)
+
+        _ranges = None
+
+        if self._coordinate_buffer is not None\
+            and self._coordinate_buffer_id == _node.getNodeId():
+
+            _ranges = coin_utils.get_dirty_ranges(
+                self._coordinate_buffer, _buffer,
+                int(len(_buffer) * self.dirty_write_ratio),
+                self.dirty_write_ranges)
+
+        if _ranges is None:
+            coin_utils.set_point_array(_node, _buffer)
+
+        elif _ranges:
+            coin_utils.set_point_ranges(_node, _buffer, _ranges)
+
+        _buffer.flags.writeable = False
+
+        #setValues() leaves trailing points in place, in which case the
+        #buffer no longer mirrors the node and is re-read on next access
+        if _node.point.getNum() > len(_buffer):
+            self._coordinate_buffer = None
+
+        else:
+            self._coordinate_buffer = _buffer
+
+        self._coordinate_buffer_id = _node.getNodeId()
+
+        self.update_indices(_buffer)
+
+    def get_world_points(self, points):
+        """
+        Return an (N,3) array of the coordinate node points in world
+        space.  Geo coordinates are placed relative to the view's geo
+        origin, other coordinates are transformed by the matrix applied
+        to the coordinate node.
+        """
+
+        _points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        _origin = self.view_state.geo_origin
+
+        if isinstance(self.geometry.coordinate, Nodes.GEO_COORDINATE):
+
+            if _origin is None:
+                return _points
+
+            return _points - _origin.geoCoords.getValue().getValue()
+
+        _matrix = coin_utils.matrix_to_array(
+            self.view_state.get_matrix(self.geometry.coordinate))
+
+        if not np.isfinite(_matrix).all():
+            return _points
+
+        return coin_utils.transform_array(_points, _matrix)
+
+    def update_indices(self, points=None):
+        """
+        Update the vertex and bounds indices with the world space points
+        of the geometry, the committed coordinates by default
+        """
+
+        if points is None:
+            points = self.get_coordinate_buffer()
+
+        _points = self.get_world_points(points)
+
+        if self.is_snap_target:
+            Geometry.vertex_index.update(self.index_ref, _points)
+
+        Geometry.bounds_index.update(self.index_ref, _points)
+
+        self.view_state.touch_geometry()
 
     def finish(self):
         """
         Cleanup
         """
 
+        Geometry.remove_from_indices(self.index_ref)
+
+        if self.view_state:
+            self.view_state.touch_geometry()
+
         self.geometry.transform = None
         self.geometry.coordinate = None
+        self._coordinate_buffer = None
 
         self.geometry.finalize()
 
@@ -23,6 +23,8 @@
 Message services for Python object intercommunication
 """
 
+from ..coin.todo import todo
+
 from .message_types import MessageTypes as Messages
 
 from .publish import Publish
@@ -35,6 +37,53 @@ class Message(Publish, Subscribe): # lgtm[py/missing-call-to-init] lgtm[py/confl
     Message services for Python object intercommunication
     """
 
+    #buffer geometry messages, delivering only the latest message per
+    #(sender, event) once per todo tick
+    coalesce_geometry = False
+
+    #(sender, event) -> (message, verbose, excluded subscribers)
+    pending_geometry = {}
+
+    #number of geometry messages replaced by a later message
+    geometry_merged = 0
+
+    @staticmethod
+    def set_geometry_coalescing(enabled=True):
+        """
+        Enable / disable coalescing of geometry messages.  Pending messages
+        are delivered when coalescing is disabled.
+        """
+
+        Message.coalesce_geometry = enabled
+
+        if not enabled:
+            Message.flush_geometry()
+
+    @staticmethod
+    def flush_geometry():
+        """
+        Deliver the pending geometry messages.  Messages dispatched by
+        subscribers are buffered for the next flush.
+        """
+
+        _pending = Message.pending_geometry
+        Message.pending_geometry = {}
+
+        for _k, _v in _pending.items():
+            _k[0].dispatch(_v[0], _k[1], _v[1], _v[2])
+
+    @staticmethod
+    def reset_geometry_merged():
+        """
+        Reset the merged geometry message counter, returning the previous
+        count
+        """
+
+        _count = Message.geometry_merged
+        Message.geometry_merged = 0
+
+        return _count
+
     def __init__(self):
         """
         Constructor
@@ -50,10 +99,28 @@ class Message(Publish, Subscribe): # lgtm[py/missing-call-to-init] lgtm[py/confl
         Dispatch a geometry update using the passed data
         """
 
-        self.dispatch(
-            message_data.geometry_message(self, data),
-            Messages.INTERNAL._GEOMETRY, verbose
-        )
+        _message = message_data.geometry_message(self, data)
+
+        if not Message.coalesce_geometry:
+
+            self.dispatch(_message, Messages.INTERNAL._GEOMETRY, verbose)
+            return
+
+        _key = (self, Messages.INTERNAL._GEOMETRY)
+
+        _excluded = frozenset(self.excluded_subscribers)
+        _pending = Message.pending_geometry.get(_key)
+
+        #a subscriber is skipped only if every merged message excluded it,
+        #so none misses an update it would have received
+        if _pending is not None:
+
+            Message.geometry_merged += 1
+            _excluded &= _pending[2]
+
+        Message.pending_geometry[_key] = (_message, verbose, _excluded)
+
+        todo.delay_keyed(Message.flush_geometry, None, Message)
 
     def dispatch_widget(self, data, verbose=False):
         """
@@ -141,6 +208,9 @@ class Message(Publish, Subscribe): # lgtm[py/missing-call-to-init] lgtm[py/confl
         Cleanup
         """
 
+        Message.pending_geometry.pop(
+            (self, Messages.INTERNAL._GEOMETRY), None)
+
         Publish.finish(self)
         Subscribe.finish(self)
         Messages.finish(Messages)
@@ -23,6 +23,8 @@
 Publish base class
 """
 
+from contextlib import contextmanager
+
 class Publish():
     """
     Base class for publisher classes
@@ -38,43 +40,88 @@ class Publish():
 
         self.pub_id = Publish.counter
         self.event_callbacks = {}
-        self.excluded_subscribers = []
+        self.excluded_subscribers = set()
+
+        #per-event tuples of (subscriber, callback), rebuilt on registration
+        #changes, and the tuple for all events, built on demand
+        self.dispatch_tables = {}
+        self.all_callbacks = None
 
         Publish.counter += 1
 
         super().__init__()
 
-    def get_subscribers(self, events=None):
+    def get_dispatch_table(self, events=None):
         """
-        Return subscribers registered for selected event
+        Return the tuple of (subscriber, callback) pairs for the events
         """
 
-        _result = []
-
         #no events specified returns all subscribers
         if not events:
 
-            for _e in self.event_callbacks:
-                _result += _e.values()
+            if self.all_callbacks is None:
 
-            return _result
+                self.all_callbacks = tuple(
+                    _v for _e in self.event_callbacks.values()
+                        for _v in _e.items()
+                )
+
+            return self.all_callbacks
 
         if not isinstance(events, list):
-            events = [events]
+            return self.dispatch_tables.get(events, ())
+
+        _result = ()
 
         for _e in events:
+            _result += self.dispatch_tables.get(_e, ())
+
+        return _result
 
-            _subs = self.event_callbacks.get(_e)
+    def update_dispatch_table(self, event):
+        """
+        Rebuild the dispatch table for an event after registration changes
+        """
 
-            #filter excluded subscribers
-            if _subs:
+        _subs = self.event_callbacks.get(event)
 
-                _result += [
-                    _c for _s, _c in _subs.items()\
-                        if _s not in self.excluded_subscribers
-                ]
+        if _subs:
+            self.dispatch_tables[event] = tuple(_subs.items())
 
-        return _result
+        else:
+            self.dispatch_tables.pop(event, None)
+
+        self.all_callbacks = None
+
+    def get_subscribers(self, events=None):
+        """
+        Return subscribers registered for selected event
+        """
+
+        return [
+            _c for _s, _c in self.get_dispatch_table(events)
+                if _s not in self.excluded_subscribers
+        ]
+
+    @contextmanager
+    def exclude_subscriber(self, who):
+        """
+        Context in which messages dispatched by this publisher are not sent
+        to the subscriber
+        """
+
+        _is_excluded = who in self.excluded_subscribers
+
+        self.excluded_subscribers.add(who)
+
+        try:
+            yield
+
+        finally:
+
+            #nested exclusions of the same subscriber end with the outermost
+            if not _is_excluded:
+                self.excluded_subscribers.discard(who)
 
     def register(self, who, events, callback=None):
         """
@@ -100,11 +147,13 @@ class Publish():
             if not _e in self.event_callbacks:
 
                 self.event_callbacks[_e] = {who: callback}
+                self.update_dispatch_table(_e)
                 continue
 
             #new subscriber for an existing event
             if who not in self.event_callbacks[_e]:
                 self.event_callbacks[_e][who] = callback
+                self.update_dispatch_table(_e)
 
     def unregister(self, who, events):
         """
@@ -130,23 +179,42 @@ class Publish():
             if not self.event_callbacks[_e]:
                 del self.event_callbacks[_e]
 
-    def dispatch(self, message, event=None, verbose=False):
+            self.update_dispatch_table(_e)
+
+    def dispatch(self, message, event=None, verbose=False, excluded=None):
         """
         Message dispatch
+
+        excluded - optional set of subscribers excluded in addition to
+        the currently excluded subscribers
         """
 
         #don't send empty messages
         if not message:
             return
 
-        _cb_list = self.get_subscribers(event)
+        _table = self.get_dispatch_table(event)
+        _excluded = self.excluded_subscribers
+
+        if excluded:
+            _excluded = _excluded | excluded
 
         if verbose:
             print('\n{} (#{}): dispatching to: {} \nmessage: \n{}\n'\
-                .format(self.name, self.pub_id, _cb_list, message))
+                .format(self.name, self.pub_id,
+                    [_c for _s, _c in _table if _s not in _excluded], message))
+
+        if not _excluded:
+
+            for _s, _cb in _table:
+                _cb(event, message)
+
+            return
+
+        for _s, _cb in _table:
 
-        for _cb in _cb_list:
-            _cb(event, message)
+            if _s not in _excluded:
+                _cb(event, message)
 
     def finish(self):
         """
@@ -155,4 +223,6 @@ class Publish():
 
         Publish.counter = 0
         self.event_callbacks = {}
-        self.excluded_subscribers = []
+        self.excluded_subscribers = set()
+        self.dispatch_tables = {}
+        self.all_callbacks = None
@@ -23,9 +23,154 @@
 Provides SoFCSelection support for Tracker classes
 """
 
+import weakref
+
+from types import SimpleNamespace
+
 from pivy import coin
 
 from ..coin.coin_styles import CoinStyles
+from ..coin.coin_enums import TaskPriority
+from ..coin.event_router import EventRouter
+from ..coin.todo import todo
+
+from .geometry import Geometry
+
+class SelectionRegistry():
+    """
+    Ordered, hash-backed registry of selected trackers.
+
+    Style changes for trackers entering or leaving the selection are
+    queued and applied in a single deferred pass, so each tracker is
+    restyled at most once per todo tick.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+
+        #dict as an ordered set
+        self.items = {}
+
+        #tracker -> selected state to apply
+        self.pending = {}
+        self.is_scheduled = False
+
+    def __contains__(self, tracker):
+
+        return tracker in self.items
+
+    def __len__(self):
+
+        return len(self.items)
+
+    def __iter__(self):
+
+        return iter(list(self.items))
+
+    def to_list(self):
+        """
+        Return the selected trackers in order of selection
+        """
+
+        return list(self.items)
+
+    def select(self, trackers):
+        """
+        Add trackers to the selection
+        """
+
+        for _v in trackers:
+
+            if _v in self.items:
+                continue
+
+            self.items[_v] = None
+            self.queue_style(_v, True)
+
+    def deselect(self, trackers):
+        """
+        Remove trackers from the selection
+        """
+
+        for _v in trackers:
+
+            if _v not in self.items:
+                continue
+
+            del self.items[_v]
+            self.queue_style(_v, False)
+
+    def toggle(self, trackers):
+        """
+        Toggle the selection of trackers
+        """
+
+        for _v in trackers:
+
+            if _v in self.items:
+                self.deselect((_v,))
+
+            else:
+                self.select((_v,))
+
+    def replace(self, trackers):
+        """
+        Replace the selection
+        """
+
+        _new = dict.fromkeys(trackers)
+
+        for _v in self.items:
+
+            if _v not in _new:
+                self.queue_style(_v, False)
+
+        for _v in _new:
+
+            if _v not in self.items:
+                self.queue_style(_v, True)
+
+        self.items = _new
+
+    def clear(self):
+        """
+        Clear the selection
+        """
+
+        self.replace(())
+
+    def queue_style(self, tracker, selected):
+        """
+        Queue a tracker to be restyled as selected or unselected
+        """
+
+        self.pending[tracker] = selected
+
+        if self.is_scheduled:
+            return
+
+        self.is_scheduled = True
+        todo.delay(self.apply_styles, None, TaskPriority.COSMETIC)
+
+    def apply_styles(self):
+        """
+        Apply the queued style changes
+        """
+
+        _pending = self.pending
+
+        self.pending = {}
+        self.is_scheduled = False
+
+        for _v, _selected in _pending.items():
+
+            if _selected:
+                _v.set_style(CoinStyles.SELECTED)
+
+            else:
+                _v.set_style(_v.coin_style)
 
 class Select():
     """
@@ -52,8 +197,88 @@ class Select():
     #Reference to the node that is currently highlighted.
     highlight_node = None
 
-    #List of currently selected elements.
-    selected = []
+    #(document, object, component) names of the SoFCSelection node ->
+    #tracker, for resolving the tracker under the mouse
+    trackers = weakref.WeakValueDictionary()
+
+    #Registry of currently selected elements.
+    selected = SelectionRegistry()
+
+    #state of box selection - the button state at the last mouse update
+    #and the world position at which the current box was started
+    box_state = SimpleNamespace(enabled=False, pressed=False, start=None)
+
+    #select trackers entirely within the box, rather than intersecting it
+    box_contained = True
+
+    @staticmethod
+    def enable_box_select(mouse_state, enabled=True):
+        """
+        Enable / disable box selection.  When enabled, dragging a rectangle
+        with the first mouse button from empty space selects the trackers
+        within it.
+        """
+
+        Select.box_state.enabled = enabled
+        Select.box_state.start = None
+
+        if enabled and Select.box_select_cb not in mouse_state.callbacks:
+            mouse_state.callbacks.append(Select.box_select_cb)
+
+        elif not enabled and Select.box_select_cb in mouse_state.callbacks:
+            mouse_state.callbacks.remove(Select.box_select_cb)
+
+    @staticmethod
+    def box_select_cb(mouse_state):
+        """
+        MouseState callback managing box selection
+        """
+
+        _btn = mouse_state.button1
+        _state = Select.box_state
+
+        #button pressed over empty space starts a box
+        if _btn.pressed and not _state.pressed:
+
+            _state.start = None
+
+            if not mouse_state.component:
+                _state.start = _btn.world_position
+
+        #button released after dragging completes it
+        elif not _btn.pressed and _state.pressed:
+
+            if _state.start and _btn.drag_start:
+
+                Select.box_select(_state.start, mouse_state.world_position,
+                    mouse_state.ctrl_down)
+
+            _state.start = None
+
+        _state.pressed = _btn.pressed
+
+    @staticmethod
+    def box_select(corner_a, corner_b, extend=False):
+        """
+        Select the trackers within the rectangle defined by the corners
+        with a single bounds index query, replacing the current selection
+        unless extend is True
+        """
+
+        #the index is keyed by weak references to the geometry and holds
+        #world space bounds.  Hidden trackers cannot be selected.
+        _found = [
+            _v for _v in [_k() for _k in Geometry.bounds_index.query(
+                corner_a, corner_b, Select.box_contained)]\
+            if isinstance(_v, Select) and _v.handle_select_events\
+                and EventRouter.is_visible(_v)
+        ]
+
+        if extend:
+            Select.selected.select(_found)
+
+        else:
+            Select.selected.replace(_found)
 
     def __init__(self):
         """
@@ -84,6 +309,13 @@ class Select():
         self.select_mouse_cb = None
         self.select_button_cb = None
 
+        Select.trackers[self.get_select_key()] = self
+
+        #a single hover dispatcher runs for all trackers after the
+        #mouse state is updated
+        if Select.update_hover not in self.mouse_state.callbacks:
+            self.mouse_state.callbacks.append(Select.update_hover)
+
         super().__init__()
 
     def add_select_events(self):
@@ -106,8 +338,6 @@ class Select():
         Mouse override
         """
 
-        self.update_highlight()
-
         if self.handle_select_events or self.handle_events:
             event_cb.setHandled()
 
@@ -132,42 +362,46 @@ class Select():
 
         pass
 
-    def update_highlight(self):
+    @staticmethod
+    def update_hover(mouse_state):
         """
-        Set the node currently being highlighted by the mouse
-        Also clears the currently highlighted tracker
+        MouseState callback setting the tracker currently highlighted by the
+        mouse.  Only the previous and new highlighted trackers are restyled.
         """
 
-        #quit if node is already highlighted
-        if Select.highlight_node is self:
-            return
+        _tracker = None
 
-        _no_component = self.mouse_state.component == ''
+        if mouse_state.component:
+
+            _tracker = Select.trackers.get((mouse_state.document,
+                mouse_state.object, mouse_state.component))
+
+            #no selectable tracker under the mouse, keep current highlight
+            if _tracker is None or not _tracker.handle_select_events:
+                return
+
+        if _tracker is Select.highlight_node:
+            return
 
         #unhighlight the current node if it exists
         if Select.highlight_node:
 
-            #and this is a event-consuming tracker or no component was found
-            #under the mouse
-            if self.handle_select_events or _no_component:
+            if not Select.highlight_node.is_selected():
 
-                if not Select.highlight_node.is_selected():
+                Select.highlight_node.set_style(
+                    Select.highlight_node.coin_style)
 
-                    Select.highlight_node.set_style(
-                        Select.highlight_node.coin_style)
+            Select.highlight_node = None
 
-                    Select.highlight_node = None
-
-        #Don't highlight the current tracker if it's been selected
-        #or no component was found under the mouse
-        if self.is_selected() or _no_component:
+        #Don't highlight the tracker if it's been selected
+        #or no tracker was found under the mouse
+        if _tracker is None or _tracker.is_selected():
             return
 
-        if self.handle_select_events:
-            #highlight and set current node as highlighted node
-            self.set_style(CoinStyles.SELECTED)
+        #highlight and set current node as highlighted node
+        _tracker.set_style(CoinStyles.SELECTED)
 
-            Select.highlight_node = self
+        Select.highlight_node = _tracker
 
     def do_selection(self):
         """
@@ -199,22 +433,12 @@ class Select():
         #event is consumed and a component is under the mouse
         if self.handle_select_events and self.mouse_state.component:
 
-            self.set_style(CoinStyles.SELECTED)
-
-            for _v in Select.selected:
-                _v.set_style(_v.coin_style)
-
-            Select.selected = [self]
-
+            Select.selected.replace((self,))
             return
 
         #otherwise, clear all
-        self.set_style(self.coin_style)
-
-        for _v in Select.selected:
-            _v.set_style(_v.coin_style)
-
-        Select.selected = []
+        Select.selected.queue_style(self, False)
+        Select.selected.clear()
 
     def do_multi_select(self):
         """
@@ -225,25 +449,26 @@ class Select():
         if not (self.handle_select_events and self.mouse_state.component):
             return
 
-        _style = self.coin_style
-
-        if self.is_selected():
+        Select.selected.toggle((self,))
 
-            _idx = Select.selected.index(self)
-            del Select.selected[_idx]
-
-        else:
-
-            Select.selected.append(self)
-            _style = CoinStyles.SELECTED
+    def get_select_key(self):
+        """
+        Return the (document, object, component) names of the tracker's
+        SoFCSelection node, as reported by picks under the mouse
+        """
 
-        self.set_style(_style)
+        return (self.names[2], self.names[1], self.names[0])
 
     def finish(self):
         """
         Cleanup
         """
 
+        _key = self.get_select_key()
+
+        if Select.trackers.get(_key) is self:
+            del Select.trackers[_key]
+
         self.select = None
-        Select.selected = []
+        Select.selected = SelectionRegistry()
         Select.highlight_node = None